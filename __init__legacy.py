@@ -12,13 +12,25 @@ bl_info = {
 
 if 'bpy' in locals():
     import importlib
+    importlib.reload(png_reader)
+    importlib.reload(tool_wheel_layout)
+    importlib.reload(shaders)
+    importlib.reload(performance)
+    importlib.reload(brush_assets)
+    importlib.reload(tool_data)
     importlib.reload(preferences)
+    importlib.reload(tool_wheel_draw)
     importlib.reload(tool_wheel_operator)
-    importlib.reload(tool_data)
 else:
+    from . import png_reader
+    from . import tool_wheel_layout
+    from . import shaders
+    from . import performance
+    from . import brush_assets
     from . import preferences
-    from . import tool_wheel_operator
     from . import tool_data
+    from . import tool_wheel_draw
+    from . import tool_wheel_operator
 
 import bpy
 
@@ -46,23 +58,38 @@ def addon_init():
     # Load tool icons
     tool_data.tool_data.get_tool_icon_textures()
 
-    # Remember last used draw brush
+    # Remember last used draw brush and index the brush assets in the asset libraries
     if bpy.app.version >= (4, 3, 0):
-        bpy.app.timers.register(tool_wheel_operator.store_active_draw_brush, first_interval=2.0, persistent=True)
+        tool_wheel_operator.subscribe_to_draw_brush()
+        brush_assets.schedule_brush_asset_index()
+
+    # Rebuild the wheel in the background when theme or ui scale change, and build it now
+    tool_wheel_operator.subscribe_to_wheel_style()
+    tool_wheel_operator.schedule_warm_up()
+
+    # Subscribe again after loading a file
+    if tool_wheel_operator.on_load_post not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(tool_wheel_operator.on_load_post)
 
 
 # Addon registration
 def register():
     bpy.utils.register_class(preferences.GPToolWheel_PG_tool)
     bpy.utils.register_class(preferences.GPToolWheel_PG_mode_order)
+    bpy.utils.register_class(preferences.GPToolWheel_PG_preset)
     bpy.utils.register_class(preferences.GPToolWheelPreferences)
     bpy.utils.register_class(preferences.GPTOOLWHEEL_UL_ModeList)
     bpy.utils.register_class(preferences.GPTOOLWHEEL_OT_MoveItem)
     bpy.utils.register_class(preferences.GPTOOLWHEEL_OT_AssignHotkey)
     bpy.utils.register_class(preferences.GPTOOLWHEEL_OT_SavePrefDefinition)
     bpy.utils.register_class(preferences.GPTOOLWHEEL_OT_LoadPrefDefinition)
+    bpy.utils.register_class(preferences.GPTOOLWHEEL_OT_ExportLatencySamples)
+    bpy.utils.register_class(preferences.GPTOOLWHEEL_OT_SavePreset)
+    bpy.utils.register_class(preferences.GPTOOLWHEEL_OT_RemovePreset)
+    bpy.utils.register_class(preferences.GPTOOLWHEEL_OT_SwitchPreset)
     bpy.utils.register_class(preferences.GPENCIL_OT_link_brush_to_gp_tool_wheel)
     bpy.utils.register_class(tool_wheel_operator.GPENCIL_OT_tool_wheel)
+    bpy.utils.register_class(tool_wheel_operator.GPENCIL_OT_tool_wheel_no_undo)
 
     # Delayed inits
     bpy.app.timers.register(addon_init, first_interval=0.2, persistent=True)
@@ -71,13 +98,19 @@ def register():
 def unregister():
     bpy.utils.unregister_class(preferences.GPToolWheel_PG_tool)
     bpy.utils.unregister_class(preferences.GPToolWheel_PG_mode_order)
+    bpy.utils.unregister_class(preferences.GPToolWheel_PG_preset)
     bpy.utils.unregister_class(preferences.GPToolWheelPreferences)
     bpy.utils.unregister_class(preferences.GPTOOLWHEEL_UL_ModeList)
     bpy.utils.unregister_class(preferences.GPTOOLWHEEL_OT_MoveItem)
     bpy.utils.unregister_class(preferences.GPTOOLWHEEL_OT_AssignHotkey)
     bpy.utils.unregister_class(preferences.GPTOOLWHEEL_OT_SavePrefDefinition)
     bpy.utils.unregister_class(preferences.GPTOOLWHEEL_OT_LoadPrefDefinition)
+    bpy.utils.unregister_class(preferences.GPTOOLWHEEL_OT_ExportLatencySamples)
+    bpy.utils.unregister_class(preferences.GPTOOLWHEEL_OT_SavePreset)
+    bpy.utils.unregister_class(preferences.GPTOOLWHEEL_OT_RemovePreset)
+    bpy.utils.unregister_class(preferences.GPTOOLWHEEL_OT_SwitchPreset)
     bpy.utils.unregister_class(preferences.GPENCIL_OT_link_brush_to_gp_tool_wheel)
+    bpy.utils.unregister_class(tool_wheel_operator.GPENCIL_OT_tool_wheel_no_undo)
     bpy.utils.unregister_class(tool_wheel_operator.GPENCIL_OT_tool_wheel)
 
     # Remove hotkey
@@ -86,6 +119,16 @@ def unregister():
     # Remove brush asset context menu item
     preferences.remove_brush_asset_context_menu_item()
 
+    # Stop tracking the draw brush, theme and ui scale
+    if bpy.app.version >= (4, 3, 0):
+        tool_wheel_operator.unsubscribe_from_draw_brush()
+        tool_wheel_operator.unwatch_unintended_tint_tool()
+        brush_assets.cancel_brush_asset_index()
+    tool_wheel_operator.unsubscribe_from_wheel_style()
+    tool_wheel_operator.cancel_warm_up()
+    if tool_wheel_operator.on_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(tool_wheel_operator.on_load_post)
+
 
 if __name__ == "__main__":
     register()
@@ -0,0 +1,273 @@
+'''
+GP Tool Wheel
+
+Benchmark of the tool wheel hot paths: building the wheel model, preparing the wheel
+(operator invoke), drawing a frame and hit-testing while the mouse sweeps over the wheel.
+Runs under plain CPython with stand-ins for the Blender modules, so timings cover
+the Python side only; draw calls and texture binds are counted instead of executed.
+Exits with status 1 when moving the mouse within one tool button redraws the wheel.
+
+Usage, from the repository root:
+    python benchmarks/bench_tool_wheel.py
+    python benchmarks/bench_tool_wheel.py --modes 1 6 --ui-scales 1.0 2.0
+    python benchmarks/bench_tool_wheel.py --json bench_output.json
+'''
+
+import argparse
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from os import path
+from types import SimpleNamespace
+
+sys.path.insert(0, path.dirname(path.abspath(__file__)))
+import blender_standins as standins  # noqa: E402
+
+
+PACKAGE_NAME = 'gp_tool_wheel'
+
+
+# Time function per call, returns timings in microseconds
+def time_calls(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        function()
+        timings.append((time.perf_counter_ns() - start) / 1000)
+    return timings
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        'calls': len(timings),
+        'mean_us': round(statistics.fmean(timings), 2),
+        'median_us': round(statistics.median(timings), 2),
+        'p95_us': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+        'min_us': round(timings[0], 2),
+    }
+
+
+# Count gpu work and memory allocations of one call
+def count_call(function):
+    standins.counters.clear()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    new_blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+    counts = dict(standins.counters)
+    counts['alloc_peak_kib'] = round(peak / 1024, 1)
+    counts['alloc_new_blocks'] = new_blocks
+    return counts
+
+
+# Addon preferences with the default tools enabled in the first mode_count modes
+def make_addon_prefs(td, mode_count, show_perf_hud=False):
+    tools = []
+    for mode_i, mode in enumerate(td.modes):
+        for i, tool in enumerate(td.tools_per_mode[mode]['tools']):
+            tools.append(SimpleNamespace(mode=mode, tool_index=i, enabled=tool['default'] and mode_i < mode_count,
+                                         asset_lib_type='', asset_lib_id='', asset_id=''))
+    mode_order = [SimpleNamespace(name=td.tools_per_mode[mode]['name'], order=i, mode=mode)
+                  for i, mode in enumerate(td.modes)]
+    prefs = SimpleNamespace(tools=tools, mode_order=mode_order, show_hints=True, show_perf_hud=show_perf_hud)
+    prefs.as_pointer = lambda: id(prefs)
+    return prefs
+
+
+# Mouse positions on circles around the wheel center, passing the inner wheel and all boxes
+def get_sweep_positions(center_x, center_y, ui_scale, steps):
+    positions = []
+    for radius in (10, 60, 120, 180):
+        for i in range(steps // 4):
+            angle = 2 * math.pi * i / (steps // 4)
+            positions.append((round(center_x + math.cos(angle) * radius * ui_scale),
+                              round(center_y + math.sin(angle) * radius * ui_scale)))
+    return positions
+
+
+# Mouse positions on a grid covering the icon of a tool button
+def get_button_positions(tool_wheel, button, steps):
+    side = max(2, math.isqrt(steps))
+    positions = []
+    for row in range(side):
+        for column in range(side):
+            positions.append((round(tool_wheel.center_x + button.x + 1 + (button.w - 2) * column / (side - 1)),
+                              round(tool_wheel.center_y + button.y - 1 - (button.h - 2) * row / (side - 1))))
+    return positions
+
+
+def run_case(addon, mode_count, ui_scale, args):
+    td = addon.tool_data.tool_data
+    tool_wheel_draw = sys.modules[PACKAGE_NAME + '.tool_wheel_draw']
+    tool_wheel_layout = sys.modules[PACKAGE_NAME + '.tool_wheel_layout']
+
+    # Set up context and preferences for this case
+    bpy = sys.modules['bpy']
+    context = standins.make_context(PACKAGE_NAME, make_addon_prefs(td, mode_count, args.perf_hud), ui_scale)
+    bpy.context = context
+    addon.preferences.tag_preferences_changed()
+    td.get_active_modes_and_tools()
+
+    operator = addon.tool_wheel_operator.GPENCIL_OT_tool_wheel()
+    center_x = context.area.width // 2
+    center_y = context.area.height // 2
+    invoke_event = standins.make_event('F8', center_x, center_y, 'PRESS')
+
+    def invoke():
+        operator.invoke(context, invoke_event)
+
+    def invoke_and_end():
+        invoke()
+        operator.ended(context)
+
+    def clear_caches():
+        tool_wheel_layout.get_wheel_layout.cache_clear()
+        tool_wheel_draw.text_widths.clear()
+        td.icon_atlas = None
+        operator.tool_wheel.model_key = None
+        operator.tool_wheel.models.clear()
+
+    result = {'modes': mode_count, 'ui_scale': ui_scale}
+
+    # Prepare, with empty caches (first invocation) and with filled caches
+    cold = []
+    for _ in range(args.cold_repeat):
+        clear_caches()
+        cold.extend(time_calls(invoke_and_end, 1))
+    clear_caches()
+    result['prepare_cold'] = summarize(cold) | count_call(invoke_and_end)
+    result['prepare'] = summarize(time_calls(invoke_and_end, args.repeat)) | count_call(invoke_and_end)
+
+    # Building the wheel model ahead of an invocation (background warm-up), with filled caches
+    def build():
+        operator.tool_wheel.build(context)
+
+    result['build'] = summarize(time_calls(build, args.repeat)) | count_call(build)
+
+    # Steady-state draw, with the mouse pointing at the first tool of the first box
+    invoke()
+    box = operator.tool_wheel.boxes[0]
+    button = box.tool_buttons[0]
+    operator.modal(context, standins.make_event(
+        'MOUSEMOVE', round(operator.tool_wheel.center_x + button.x + button.w * 0.5),
+        round(operator.tool_wheel.center_y + button.y - button.h * 0.5)))
+
+    def draw():
+        operator.tool_wheel.draw(context)
+
+    result['draw'] = summarize(time_calls(draw, args.repeat)) | count_call(draw)
+
+    # Mouse sweep: modal mouse move events, with a draw for every requested redraw
+    events = [standins.make_event('MOUSEMOVE', x, y)
+              for x, y in get_sweep_positions(operator.tool_wheel.center_x, operator.tool_wheel.center_y,
+                                              ui_scale, args.sweep_steps)]
+
+    def sweep():
+        for event in events:
+            redraws = standins.counters['redraws']
+            operator.modal(context, event)
+            if standins.counters['redraws'] != redraws:
+                draw()
+
+    def move():
+        for event in events:
+            operator.modal(context, event)
+
+    # Mouse sweep within the first tool button: the wheel should hardly be redrawn
+    button_events = [standins.make_event('MOUSEMOVE', x, y)
+                     for x, y in get_button_positions(operator.tool_wheel, button, args.sweep_steps)]
+
+    def button_sweep():
+        operator.modal(context, button_events[0])
+        standins.counters.clear()
+        for event in button_events:
+            operator.modal(context, event)
+
+    button_sweep()
+    result['button_sweep'] = {'events': len(button_events), 'redraws': standins.counters['redraws']}
+
+    timings = time_calls(move, max(1, args.repeat // 10))
+    result['mouse_move'] = summarize([t / len(events) for t in timings])
+    result['sweep'] = {'events': len(events)} | count_call(sweep)
+    operator.ended(context)
+
+    return result
+
+
+def print_results(results):
+    header = f'{"modes":>5} {"scale":>5}  {"prepare cold":>12} {"build":>9} {"prepare":>9} {"draw":>9} {"move":>9}' \
+             f'  {"draw calls":>10} {"binds":>5} {"redraws":>7} {"in button":>9}'
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f'{r["modes"]:>5} {r["ui_scale"]:>5}  {r["prepare_cold"]["median_us"]:>10.0f}us'
+              f' {r["build"]["median_us"]:>7.0f}us {r["prepare"]["median_us"]:>7.1f}us {r["draw"]["median_us"]:>7.1f}us'
+              f' {r["mouse_move"]["median_us"]:>7.1f}us'
+              f'  {r["draw"].get("draw_calls", 0):>10} {r["draw"].get("texture_binds", 0):>5}'
+              f' {r["sweep"].get("redraws", 0):>4}/{r["sweep"]["events"]}'
+              f' {r["button_sweep"]["redraws"]:>5}/{r["button_sweep"]["events"]}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the GP Tool Wheel outside Blender')
+    parser.add_argument('--modes', type=int, nargs='+', default=[1, 2, 3, 4, 5, 6],
+                        help='Numbers of active modes to benchmark')
+    parser.add_argument('--ui-scales', type=float, nargs='+', default=[1.0, 1.5, 2.0],
+                        help='Blender ui scales to benchmark')
+    parser.add_argument('--repeat', type=int, default=200, help='Number of timed calls per measurement')
+    parser.add_argument('--cold-repeat', type=int, default=10, help='Number of timed calls with empty caches')
+    parser.add_argument('--sweep-steps', type=int, default=400, help='Number of mouse events in the sweep')
+    parser.add_argument('--perf-hud', action='store_true', help='Draw the wheel with the performance HUD enabled')
+    parser.add_argument('--blender-version', default='4.3.0', help='Blender version the stand-ins report')
+    parser.add_argument('--json', metavar='PATH', help='Write results as JSON to PATH (- for stdout)')
+    args = parser.parse_args()
+
+    version = tuple(int(v) for v in args.blender_version.split('.'))
+    standins.install(version)
+    addon = standins.load_addon(PACKAGE_NAME)
+
+    # Load icons once, like the addon does after registering
+    sys.modules['bpy'].context = standins.make_context(PACKAGE_NAME, None)
+    start = time.perf_counter()
+    addon.tool_data.tool_data.get_tool_icon_textures()
+    icon_load_ms = (time.perf_counter() - start) * 1000
+
+    results = [run_case(addon, mode_count, ui_scale, args) for mode_count in args.modes
+               for ui_scale in args.ui_scales]
+
+    if args.json:
+        output = {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'blender_version': args.blender_version,
+            'icon_load_ms': round(icon_load_ms, 2),
+            'results': results,
+        }
+        if args.json == '-':
+            json.dump(output, sys.stdout, indent=2)
+        else:
+            with open(args.json, 'w') as outfile:
+                json.dump(output, outfile, indent=2)
+    else:
+        print(f'Icon loading: {icon_load_ms:.1f}ms')
+        print_results(results)
+
+    # Moving within a tool button doesn't change the look of the wheel, so it shouldn't redraw
+    failed = [r for r in results if r['button_sweep']['redraws'] > 0]
+    for r in failed:
+        print(f'Redraws within one tool button: {r["button_sweep"]["redraws"]} '
+              f'(modes {r["modes"]}, ui scale {r["ui_scale"]})', file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
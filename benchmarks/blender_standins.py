@@ -0,0 +1,285 @@
+'''
+GP Tool Wheel
+
+Benchmark stand-ins
+Minimal replacements for the Blender modules bpy, gpu, blf, gpu_extras and bpy_extras,
+just enough to run the tool wheel under plain CPython. GPU and text calls do no work,
+they are only counted.
+'''
+
+import importlib
+import importlib.util
+import sys
+from collections import Counter
+from os import path
+from types import ModuleType, SimpleNamespace
+
+
+# Counted calls: draw_calls, texture_binds, shader_binds, textures_created, batches_created,
+# text_draws and redraws
+counters = Counter()
+
+
+# Dictionary with the items() behaviour of a Blender collection (subscriptable list of pairs)
+class Collection(dict):
+    def items(self):
+        return list(super().items())
+
+
+# ---- gpu ----
+
+class Shader():
+    def __init__(self, name):
+        self.name = name
+
+    def bind(self):
+        counters['shader_binds'] += 1
+
+    def uniform_sampler(self, name, texture):
+        counters['texture_binds'] += 1
+
+    def uniform_float(self, name, value):
+        pass
+
+
+class Batch():
+    def __init__(self, shader, type, content, indices=None):
+        self.vertex_count = len(next(iter(content.values())))
+        self.index_count = 0 if indices is None else len(indices)
+        counters['batches_created'] += 1
+
+    def draw(self, shader=None):
+        counters['draw_calls'] += 1
+
+
+class Buffer():
+    def __init__(self, format, dimensions, data=None):
+        self.format = format
+        self.dimensions = dimensions
+        self.data = data
+
+
+class GPUTexture():
+    def __init__(self, size, format='RGBA8', data=None):
+        self.width, self.height = size
+        self.format = format
+        counters['textures_created'] += 1
+
+
+def from_builtin(name, config='DEFAULT'):
+    return Shader(name)
+
+
+def create_from_info(info):
+    return Shader('custom')
+
+
+# Shader create info and stage interface info, ignoring everything added
+class ShaderInfo():
+    def __init__(self, name=''):
+        self.name = name
+
+    def __getattr__(self, name):
+        return do_nothing
+
+
+def batch_for_shader(shader, type, content, indices=None):
+    return Batch(shader, type, content, indices)
+
+
+def draw_texture_2d(texture, position, width, height):
+    counters['texture_binds'] += 1
+    counters['draw_calls'] += 1
+
+
+def do_nothing(*args, **kwargs):
+    pass
+
+
+# ---- blf ----
+
+class FontState():
+    size = 11
+
+
+def blf_size(fontid, size, dpi=72):
+    FontState.size = size
+
+
+# Rough text extent, proportional to font size
+def blf_dimensions(fontid, text):
+    return len(text) * FontState.size * 0.55, FontState.size
+
+
+def blf_draw(fontid, text, length=None):
+    counters['text_draws'] += 1
+
+
+# ---- bpy ----
+
+class Timers():
+    def __init__(self):
+        self.registered = set()
+
+    def register(self, function, first_interval=0, persistent=False):
+        self.registered.add(function)
+
+    def unregister(self, function):
+        self.registered.discard(function)
+
+    def is_registered(self, function):
+        return function in self.registered
+
+
+class MessageBus():
+    def __init__(self):
+        self.subscriptions = []
+
+    def subscribe_rna(self, key, owner, args, notify, options=set()):
+        self.subscriptions.append((owner, key, notify))
+
+    def clear_by_owner(self, owner):
+        self.subscriptions = [sub for sub in self.subscriptions if sub[0] is not owner]
+
+
+# Placeholder for any bpy.types class (Operator, AddonPreferences, GpPaint, etc.)
+class BlenderType():
+    @classmethod
+    def append(cls, draw_func):
+        pass
+
+    @classmethod
+    def remove(cls, draw_func):
+        pass
+
+
+def get_bpy_type(name):
+    if name.startswith('__'):
+        raise AttributeError(name)
+    cls = type(name, (BlenderType,), {})
+    setattr(bpy_types, name, cls)
+    return cls
+
+
+def get_bpy_property(name):
+    if name.startswith('__'):
+        raise AttributeError(name)
+    return lambda *args, **kwargs: None
+
+
+def persistent(function):
+    return function
+
+
+def new_module(name, **attributes):
+    module = ModuleType(name)
+    module.__dict__.update(attributes)
+    sys.modules[name] = module
+    return module
+
+
+bpy_types = None
+
+
+# Install the stand-in modules in sys.modules, for the given Blender version
+def install(version=(4, 3, 0)):
+    global bpy_types
+
+    gpu = new_module('gpu')
+    gpu.shader = new_module('gpu.shader', from_builtin=from_builtin, create_from_info=create_from_info)
+    gpu.types = new_module('gpu.types', Buffer=Buffer, GPUTexture=GPUTexture,
+                           GPUShader=lambda vertexcode, fragcode, **kwargs: Shader('custom'),
+                           GPUShaderCreateInfo=ShaderInfo, GPUStageInterfaceInfo=ShaderInfo)
+    gpu.matrix = new_module('gpu.matrix', push=do_nothing, pop=do_nothing, translate=do_nothing,
+                            scale=do_nothing)
+    gpu.state = new_module('gpu.state', blend_set=do_nothing, line_width_set=do_nothing)
+
+    gpu_extras = new_module('gpu_extras')
+    gpu_extras.batch = new_module('gpu_extras.batch', batch_for_shader=batch_for_shader)
+    gpu_extras.presets = new_module('gpu_extras.presets', draw_texture_2d=draw_texture_2d)
+
+    new_module('blf', size=blf_size, dimensions=blf_dimensions, color=do_nothing, position=do_nothing,
+               draw=blf_draw)
+
+    bpy = new_module('bpy')
+    bpy_types = new_module('bpy.types', __getattr__=get_bpy_type)
+    bpy.types = bpy_types
+    bpy.props = new_module('bpy.props', __getattr__=get_bpy_property)
+    bpy.app = new_module('bpy.app', version=version, timers=Timers())
+    bpy.app.handlers = new_module('bpy.app.handlers', persistent=persistent, load_post=[])
+    bpy.msgbus = MessageBus()
+    bpy.utils = new_module('bpy.utils', register_class=do_nothing, unregister_class=do_nothing)
+    bpy.ops = SimpleNamespace()
+    bpy.data = SimpleNamespace(images={})
+    bpy.context = None
+
+    bpy_extras = new_module('bpy_extras')
+    bpy_extras.io_utils = new_module('bpy_extras.io_utils', ExportHelper=BlenderType, ImportHelper=BlenderType)
+    return bpy
+
+
+# Import the addon package from the repository root, under the given package name
+def load_addon(name='gp_tool_wheel'):
+    root = path.dirname(path.dirname(path.abspath(__file__)))
+    spec = importlib.util.spec_from_file_location(name, path.join(root, '__init__.py'),
+                                                  submodule_search_locations=[root])
+    package = importlib.util.module_from_spec(spec)
+    sys.modules[name] = package
+    spec.loader.exec_module(package)
+    importlib.import_module(name + '.tool_wheel_draw')
+    importlib.import_module(name + '.tool_wheel_layout')
+    return package
+
+
+# ---- Context ----
+
+class Area():
+    def __init__(self, width, height):
+        self.type = 'VIEW_3D'
+        self.x = 0
+        self.y = 0
+        self.width = width
+        self.height = height
+        self.regions = [
+            SimpleNamespace(type='TOOLS', alignment='LEFT', width=48, height=height),
+            SimpleNamespace(type='UI', alignment='RIGHT', width=1, height=height),
+            SimpleNamespace(type='HEADER', alignment='TOP', width=width, height=26),
+            SimpleNamespace(type='TOOL_HEADER', alignment='TOP', width=width, height=26),
+            SimpleNamespace(type='WINDOW', alignment='NONE', width=width, height=height),
+        ]
+        self.spaces = [SimpleNamespace(draw_handler_add=lambda *args: object(), draw_handler_remove=do_nothing)]
+
+    def tag_redraw(self):
+        counters['redraws'] += 1
+
+
+# Create the context the tool wheel operator runs in, with the addon preferences of package_name
+def make_context(package_name, addon_prefs, ui_scale=1.0, area_size=(1600, 900)):
+    wcol = SimpleNamespace(inner=(0.16, 0.16, 0.16, 1.0), inner_sel=(0.28, 0.45, 0.7, 1.0),
+                           outline=(0.24, 0.24, 0.24, 1.0), text=(0.9, 0.9, 0.9))
+    theme = SimpleNamespace(user_interface=SimpleNamespace(wcol_toolbar_item=wcol))
+    preferences = SimpleNamespace(
+        system=SimpleNamespace(ui_scale=ui_scale),
+        themes=Collection({'Default': theme}),
+        addons=Collection({package_name: SimpleNamespace(preferences=addon_prefs)}),
+        is_dirty=False,
+    )
+
+    def paint_settings():
+        return SimpleNamespace(show_brush=True, brush=None, brush_asset_reference=None)
+
+    return SimpleNamespace(
+        preferences=preferences,
+        area=Area(*area_size),
+        window=SimpleNamespace(cursor_modal_set=do_nothing, cursor_modal_restore=do_nothing),
+        window_manager=SimpleNamespace(modal_handler_add=do_nothing),
+        object=SimpleNamespace(type='GREASEPENCIL'),
+        mode='PAINT_GREASE_PENCIL',
+        tool_settings=SimpleNamespace(gpencil_paint=paint_settings(), gpencil_sculpt_paint=paint_settings(),
+                                      gpencil_vertex_paint=paint_settings(),
+                                      gpencil_weight_paint=paint_settings()),
+    )
+
+
+def make_event(type, x, y, value='NOTHING'):
+    return SimpleNamespace(type=type, value=value, mouse_x=x, mouse_y=y, mouse_region_x=x, mouse_region_y=y)
@@ -0,0 +1,293 @@
+'''
+GP Tool Wheel
+
+Brush assets
+Cache of activated brush assets: picking the brush that is already active skips the activation,
+brushes already in the session as local or linked datablocks are tracked for the statistics.
+Index of the brush assets in the essentials and user asset libraries, for marking wheel tools and
+preferences with a stale brush asset reference. The index is built in small steps in a timer,
+brush names per .blend file are cached on disk by file path and modification time.
+Reading a .blend file that isn't cached can't be split up: a step reads at most one such file,
+so a step with a large library file can take well over the step time (only for new or changed files).
+'''
+
+import json
+import os
+from time import perf_counter
+
+import bpy
+
+
+# Key of a brush asset: (asset library type, asset library identifier, relative asset identifier)
+def get_asset_key(asset):
+    return (asset['asset_library_type'], asset['asset_library_identifier'], asset['relative_asset_identifier'])
+
+
+def get_reference_key(reference):
+    return (reference.asset_library_type, reference.asset_library_identifier, reference.relative_asset_identifier)
+
+
+class BrushAssetCache():
+    def __init__(self):
+        # Brush datablocks of activated assets: asset key -> (brush name, library filepath)
+        self.brushes = {}
+        self.hits_active = 0
+        self.hits_loaded = 0
+        self.misses = 0
+
+    # Is the brush datablock of the asset still in the session?
+    def is_loaded(self, key):
+        if key not in self.brushes:
+            return False
+        if bpy.data.brushes.get(self.brushes[key]) is None:
+            del self.brushes[key]
+            return False
+        return True
+
+    # Activate brush asset in the paint settings of the current mode.
+    # Returns 'ACTIVE' (already active, skipped), 'LOADED' (brush already in the session),
+    # 'ADDED' (brush linked or appended to the session) or 'FAILED' (asset not found).
+    def activate(self, context, paint, asset):
+        key = get_asset_key(asset)
+
+        # Fast path: brush is already the active brush of the active brush tool, nothing to do
+        if paint is not None and paint.brush is not None and paint.brush_asset_reference is not None \
+                and get_reference_key(paint.brush_asset_reference) == key:
+            tool = context.workspace.tools.from_space_view3d_mode(context.mode, create=False)
+            if tool is not None and tool.idname == 'builtin.brush':
+                self.hits_active += 1
+                return 'ACTIVE'
+
+        # Brush datablock already in the session (activated all the same, brushes can't be assigned directly)
+        if self.is_loaded(key):
+            self.hits_loaded += 1
+            result = 'LOADED'
+        else:
+            self.misses += 1
+            result = 'ADDED'
+
+        try:
+            status = bpy.ops.brush.asset_activate(asset_library_type=key[0], asset_library_identifier=key[1],
+                                                  relative_asset_identifier=key[2])
+        except RuntimeError:
+            status = {'CANCELLED'}
+        if 'FINISHED' not in status:
+            return 'FAILED'
+
+        # Asset found, also when the index doesn't know it yet (e.g. saved to a library during the session)
+        if brush_asset_index.add(key):
+            schedule_wheel_update()
+
+        # Remember the brush datablock the asset resolved to
+        if paint is not None and paint.brush is not None:
+            brush = paint.brush
+            self.brushes[key] = (brush.name, brush.library.filepath if brush.library else None)
+        return result
+
+    # Get number of activations, the percentage skipped (brush already active)
+    # and the percentage of activated brushes already in the session
+    def get_stats(self):
+        count = self.hits_active + self.hits_loaded + self.misses
+        if count == 0:
+            return 0, 0.0, 0.0
+        return count, self.hits_active / count * 100, self.hits_loaded / count * 100
+
+    # Forget brush datablocks (after loading another file)
+    def clear(self):
+        self.brushes = {}
+
+
+brush_asset_cache = BrushAssetCache()
+
+
+class BrushAssetIndex():
+    CACHE_FILE = 'brush_asset_index.json'
+    CACHE_VERSION = 1
+    # Time spent per timer step, in seconds (checked between files, see module docstring)
+    STEP_TIME = 0.005
+
+    def __init__(self):
+        # Asset keys of all brush assets in the indexed libraries
+        self.assets = set()
+        # Indexed libraries: (asset library type, asset library identifier)
+        self.libraries = set()
+        # Incremented when a rebuilt index differs from the previous one
+        self.generation = 0
+
+        # Index under construction
+        self.pending = None
+        self.new_assets = set()
+        self.new_libraries = set()
+
+        # Brush names per .blend file: file path -> (modification time, brush names)
+        self.files = None
+        self.new_files = {}
+        self.cache_changed = False
+
+    # Check brush asset reference: True (valid), False (stale) or None (unknown, library not indexed yet)
+    def check(self, key):
+        library_type, library_id, asset_id = key
+
+        # Assets in the current file are checked directly
+        if library_type == 'LOCAL':
+            brush = bpy.data.brushes.get(asset_id.rsplit('/', 1)[-1])
+            return brush is not None and brush.asset_data is not None
+
+        if (library_type, library_id) not in self.libraries:
+            return None
+        return key in self.assets
+
+    # Add asset known to be valid (e.g. the active brush asset), returns True when it was missing
+    def add(self, key):
+        if (key[0], key[1]) not in self.libraries or key in self.assets:
+            return False
+        self.assets.add(key)
+        self.generation += 1
+        return True
+
+    # Get essentials and user asset libraries: (type, identifier, root directory)
+    def get_libraries(self):
+        libraries = []
+        essentials = bpy.utils.system_resource('DATAFILES', path='assets')
+        if essentials:
+            libraries.append(('ESSENTIALS', '', essentials))
+        for library in bpy.context.preferences.filepaths.asset_libraries:
+            libraries.append(('CUSTOM', library.name, bpy.path.abspath(library.path)))
+        return libraries
+
+    # Iterate over .blend files in the libraries, with a closing None file path per library.
+    # Libraries with a directory that doesn't exist (yet) aren't indexed, their assets stay unknown.
+    def iter_blend_files(self, libraries):
+        for library_type, library_id, root in libraries:
+            if not os.path.isdir(root):
+                continue
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames[:] = [dirname for dirname in dirnames if not dirname.startswith('.')]
+                for filename in filenames:
+                    if filename.endswith('.blend'):
+                        yield library_type, library_id, root, os.path.join(dirpath, filename)
+            yield library_type, library_id, root, None
+
+    # Start (re)building the index, the current index stays in use until the new one is complete
+    def start(self):
+        if self.files is None:
+            self.load_cache()
+        self.pending = self.iter_blend_files(self.get_libraries())
+        self.new_assets = set()
+        self.new_libraries = set()
+        self.new_files = {}
+
+    # Index files until the step time is used, returns False when the index is complete
+    def step(self):
+        if self.pending is None:
+            return False
+
+        start_time = perf_counter()
+        for library_type, library_id, root, filepath in self.pending:
+            if filepath is None:
+                self.new_libraries.add((library_type, library_id))
+            else:
+                relative_path = os.path.relpath(filepath, root).replace(os.sep, '/')
+                names, is_read = self.get_brush_names(filepath)
+                for name in names:
+                    self.new_assets.add((library_type, library_id, f'{relative_path}/Brush/{name}'))
+                # One file read per step
+                if is_read:
+                    return True
+            if perf_counter() - start_time > self.STEP_TIME:
+                return True
+
+        # Index complete, swap it in
+        if self.new_assets != self.assets or self.new_libraries != self.libraries:
+            self.assets = self.new_assets
+            self.libraries = self.new_libraries
+            self.generation += 1
+        self.pending = None
+        if self.cache_changed or len(self.new_files) != len(self.files):
+            self.files = self.new_files
+            self.save_cache()
+        return False
+
+    # Get names of the brush assets in a .blend file, from the cache when the file hasn't changed.
+    # Returns the names and whether the file was read.
+    def get_brush_names(self, filepath):
+        try:
+            mtime = os.path.getmtime(filepath)
+        except OSError:
+            return [], False
+
+        cached = self.files.get(filepath)
+        is_read = cached is None or cached[0] != mtime
+        if not is_read:
+            names = cached[1]
+        else:
+            # Read asset metadata only, nothing is linked or appended
+            try:
+                with bpy.data.libraries.load(filepath, assets_only=True) as (data_from, _):
+                    names = list(data_from.brushes)
+            except (OSError, RuntimeError):
+                names = []
+            self.cache_changed = True
+
+        self.new_files[filepath] = (mtime, names)
+        return names, is_read
+
+    def get_cache_path(self):
+        try:
+            directory = bpy.utils.extension_path_user(__package__, create=True)
+        except (AttributeError, ValueError):
+            directory = bpy.utils.user_resource('CONFIG', path=__package__, create=True)
+        return os.path.join(directory, self.CACHE_FILE)
+
+    def load_cache(self):
+        self.files = {}
+        try:
+            with open(self.get_cache_path(), 'r') as infile:
+                data = json.load(infile)
+            if data['version'] == self.CACHE_VERSION:
+                self.files = {filepath: (mtime, names) for filepath, mtime, names in data['files']}
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def save_cache(self):
+        data = {
+            'version': self.CACHE_VERSION,
+            'files': [(filepath, mtime, names) for filepath, (mtime, names) in self.files.items()],
+        }
+        try:
+            with open(self.get_cache_path(), 'w') as outfile:
+                json.dump(data, outfile)
+            self.cache_changed = False
+        except OSError:
+            pass
+
+
+brush_asset_index = BrushAssetIndex()
+
+
+# The wheel marks tools with a missing brush asset: rebuild it in the background when the index changed
+def schedule_wheel_update():
+    from .tool_wheel_operator import schedule_warm_up
+    schedule_warm_up()
+
+
+# Timer step of building the brush asset index
+def update_brush_asset_index():
+    generation = brush_asset_index.generation
+    if brush_asset_index.step():
+        return 0.01
+    if brush_asset_index.generation != generation:
+        schedule_wheel_update()
+    return None
+
+
+# (Re)build the brush asset index in the background
+def schedule_brush_asset_index():
+    brush_asset_index.start()
+    if not bpy.app.timers.is_registered(update_brush_asset_index):
+        bpy.app.timers.register(update_brush_asset_index, first_interval=1.0)
+
+
+def cancel_brush_asset_index():
+    if bpy.app.timers.is_registered(update_brush_asset_index):
+        bpy.app.timers.unregister(update_brush_asset_index)
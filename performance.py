@@ -0,0 +1,77 @@
+'''
+GP Tool Wheel
+
+Performance metrics
+Latency samples of the tool wheel, kept in fixed size ring buffers
+'''
+
+import csv
+import math
+
+
+# Fixed size buffer of the most recent samples
+class RingBuffer():
+    def __init__(self, size):
+        self.samples = [0.0] * size
+        self.count = 0
+        self.pos = 0
+
+    def add(self, value):
+        self.samples[self.pos] = value
+        self.pos = (self.pos + 1) % len(self.samples)
+        self.count = min(self.count + 1, len(self.samples))
+
+    # Get samples, oldest first
+    def get_samples(self):
+        if self.count < len(self.samples):
+            return self.samples[0:self.count]
+        return self.samples[self.pos:] + self.samples[0:self.pos]
+
+    def clear(self):
+        self.count = 0
+        self.pos = 0
+
+
+class LatencyMetrics():
+    BUFFER_SIZE = 512
+
+    # Metric keys and labels
+    METRICS = [
+        ('invoke_to_draw', 'Invoke to First Draw'),
+        ('draw', 'Draw per Frame'),
+        ('click_to_switch', 'Click to Switch'),
+    ]
+
+    def __init__(self):
+        self.buffers = {key: RingBuffer(self.BUFFER_SIZE) for key, _ in self.METRICS}
+
+    # Add sample, in seconds
+    def add(self, metric, seconds):
+        self.buffers[metric].add(seconds)
+
+    # Get sample count and p50, p95 and max in milliseconds
+    def get_stats(self, metric):
+        samples = sorted(self.buffers[metric].get_samples())
+        if len(samples) == 0:
+            return 0, 0.0, 0.0, 0.0
+
+        def percentile(perc):
+            return samples[max(0, math.ceil(perc / 100 * len(samples)) - 1)] * 1000
+
+        return len(samples), percentile(50), percentile(95), samples[-1] * 1000
+
+    # Write raw samples to csv file, in milliseconds
+    def export_csv(self, filepath):
+        with open(filepath, 'w', newline='') as outfile:
+            writer = csv.writer(outfile)
+            writer.writerow(['metric', 'sample', 'ms'])
+            for key, _ in self.METRICS:
+                for i, seconds in enumerate(self.buffers[key].get_samples()):
+                    writer.writerow([key, i, f'{seconds * 1000:.4f}'])
+
+    def clear(self):
+        for buffer in self.buffers.values():
+            buffer.clear()
+
+
+latency_metrics = LatencyMetrics()
@@ -0,0 +1,216 @@
+'''
+GP Tool Wheel
+
+PNG reader
+Decodes the bundled PNG icons straight to pixel arrays, without creating
+Blender image datablocks. Uses only zlib and NumPy, so it runs outside Blender too.
+Supports all color types and bit depths of non-interlaced PNG files,
+the transparency chunk included. Color profile and gamma chunks are ignored.
+'''
+
+import struct
+import zlib
+
+import numpy as np
+
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Number of channels per PNG color type
+CHANNELS_OF_COLOR_TYPE = {
+    0: 1,  # Grayscale
+    2: 3,  # RGB
+    3: 1,  # Palette index
+    4: 2,  # Grayscale + alpha
+    6: 4,  # RGBA
+}
+
+
+# Read chunks of PNG file data as (type, data) tuples
+def read_chunks(data):
+    if data[0:8] != PNG_SIGNATURE:
+        raise ValueError('Not a PNG file')
+    pos = 8
+    while pos < len(data):
+        length, chunk_type = struct.unpack('>I4s', data[pos:pos + 8])
+        yield chunk_type, data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if chunk_type == b'IEND':
+            break
+
+
+# Reverse the PNG scanline filters of one or more images of the same size.
+# Raw data has shape (image count, height, 1 + width * bpp), returns bytes (image count, height, width * bpp).
+# For bit depths below 8 the width is in bytes and bpp is 1. Each pixel depends on its left, upper and upper-left neighbour, so the pixels are decoded
+# diagonal by diagonal, vectorized over all pixels on a diagonal and over all images.
+def unfilter_scanlines(raw, width, bpp):
+    count, height = raw.shape[0:2]
+    filters = raw[:, :, 0][:, :, None, None]
+    if np.any(filters > 4):
+        raise ValueError('Unknown PNG filter type')
+    rows = raw[:, :, 1:].reshape((count, height, width, bpp)).astype(np.int16)
+
+    # Decoded pixels, padded with a zero row on top and a zero column on the left
+    out = np.zeros((count, height + 1, width + 1, bpp), dtype=np.int16)
+    for diagonal in range(height + width - 1):
+        ys = np.arange(max(0, diagonal - width + 1), min(height, diagonal + 1))
+        xs = diagonal - ys
+        a = out[:, ys + 1, xs]
+        b = out[:, ys, xs + 1]
+        c = out[:, ys, xs]
+        f = filters[:, ys, 0]
+
+        # Paeth predictor
+        p = a + b - c
+        pa = np.abs(p - a)
+        pb = np.abs(p - b)
+        pc = np.abs(p - c)
+        paeth = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+
+        # Predictor per filter type: none, sub, up, average, paeth
+        predictor = np.select([f == 1, f == 2, f == 3, f == 4], [a, b, (a + b) >> 1, paeth], 0)
+        out[:, ys + 1, xs + 1] = (rows[:, ys, xs] + predictor) & 0xFF
+
+    return out[:, 1:, 1:].reshape((count, height, width * bpp)).astype(np.uint8)
+
+
+# Parse PNG file data into header values and compressed image data
+def read_header(data):
+    header = None
+    palette = None
+    transparency = None
+    idat = []
+    for chunk_type, chunk in read_chunks(data):
+        match chunk_type:
+            case b'IHDR':
+                header = struct.unpack('>IIBBBBB', chunk)
+            case b'PLTE':
+                palette = np.frombuffer(chunk, dtype=np.uint8).reshape((-1, 3))
+            case b'tRNS':
+                transparency = np.frombuffer(chunk, dtype=np.uint8)
+            case b'IDAT':
+                idat.append(chunk)
+    if header is None:
+        raise ValueError('PNG header missing')
+
+    width, height, bit_depth, color_type, _, _, interlace = header
+    if color_type not in CHANNELS_OF_COLOR_TYPE:
+        raise ValueError(f'Unsupported PNG color type {color_type}')
+    if bit_depth not in {1, 2, 4, 8, 16} or (bit_depth < 8 and color_type not in {0, 3}) \
+            or (bit_depth == 16 and color_type == 3):
+        raise ValueError(f'Unsupported PNG bit depth {bit_depth} for color type {color_type}')
+    if interlace != 0:
+        raise ValueError('Interlaced PNG files are not supported')
+    if color_type == 3 and palette is None:
+        raise ValueError('PNG palette missing')
+
+    return {
+        'width': width,
+        'height': height,
+        'bit_depth': bit_depth,
+        'color_type': color_type,
+        'palette': palette,
+        'transparency': transparency,
+        'idat': b''.join(idat),
+    }
+
+
+# Get size of a scanline in bytes (without filter type byte) and the bytes per pixel the filters use
+def get_scanline_size(png):
+    bits = CHANNELS_OF_COLOR_TYPE[png['color_type']] * png['bit_depth']
+    return (png['width'] * bits + 7) // 8, max(1, bits // 8)
+
+
+# Get integer samples (height, width, channels) of unfiltered image bytes (height, scanline size)
+def get_samples(png, rows):
+    width = png['width']
+    height = png['height']
+    bit_depth = png['bit_depth']
+    channels = CHANNELS_OF_COLOR_TYPE[png['color_type']]
+
+    if bit_depth == 16:
+        return rows.view('>u2').reshape((height, width, channels))
+    if bit_depth == 8:
+        return rows.reshape((height, width, channels))
+
+    # Unpack samples of less than a byte (grayscale and palette only), highest bits first
+    per_byte = 8 // bit_depth
+    shifts = np.arange(8 - bit_depth, -1, -bit_depth, dtype=np.uint8)
+    samples = (rows[:, :, None] >> shifts) & ((1 << bit_depth) - 1)
+    return samples.reshape((height, rows.shape[1] * per_byte))[:, 0:width, None]
+
+
+# Convert unfiltered image bytes (height, scanline size) to float RGBA pixels (height, width, 4)
+def get_rgba_pixels(png, rows):
+    width = png['width']
+    height = png['height']
+    color_type = png['color_type']
+    samples = get_samples(png, rows)
+
+    # Transparent color of grayscale and RGB images
+    transparent = None
+    if png['transparency'] is not None and color_type in {0, 2}:
+        values = np.frombuffer(png['transparency'].tobytes(), dtype='>u2')
+        transparent = np.all(samples == values[None, None, :], axis=2)
+
+    # Expand to RGBA, with samples as floats in 0..1
+    max_value = (1 << png['bit_depth']) - 1
+    pixels = np.ones((height, width, 4), dtype=np.float32)
+    match color_type:
+        case 0 | 2:
+            pixels[:, :, 0:3] = samples / max_value
+            if transparent is not None:
+                pixels[:, :, 3] = np.where(transparent, 0, 1)
+        case 3:
+            palette = png['palette']
+            indices = samples[:, :, 0]
+            if np.any(indices >= len(palette)):
+                raise ValueError('PNG palette index out of range')
+            pixels[:, :, 0:3] = palette[indices] / 255
+            if png['transparency'] is not None:
+                alpha = np.full(len(palette), 255, dtype=np.uint8)
+                alpha[0:len(png['transparency'])] = png['transparency']
+                pixels[:, :, 3] = alpha[indices] / 255
+        case 4:
+            pixels[:, :, 0:3] = samples[:, :, 0:1] / max_value
+            pixels[:, :, 3] = samples[:, :, 1] / max_value
+        case 6:
+            pixels[:, :, :] = samples / max_value
+    return pixels
+
+
+# Decode PNG file data to float RGBA pixels (height, width, 4), bottom row first like Blender images.
+# Images of the same size and format are unfiltered together, which is much faster for a set of icons.
+def decode_pngs(datas):
+    pngs = [read_header(data) for data in datas]
+
+    # Group images by scanline size and format
+    groups = {}
+    for i, png in enumerate(pngs):
+        size, bpp = get_scanline_size(png)
+        groups.setdefault((size, png['height'], bpp), []).append(i)
+
+    # Decompress and unfilter scanlines
+    images = [None] * len(pngs)
+    for (size, height, bpp), indices in groups.items():
+        raw = np.empty((len(indices), height, 1 + size), dtype=np.uint8)
+        for raw_i, i in enumerate(indices):
+            raw[raw_i] = np.frombuffer(zlib.decompress(pngs[i]['idat']), dtype=np.uint8).reshape((height, -1))
+        rows = unfilter_scanlines(raw, size // bpp, bpp)
+        for raw_i, i in enumerate(indices):
+            images[i] = np.ascontiguousarray(get_rgba_pixels(pngs[i], rows[raw_i])[::-1])
+
+    return images
+
+
+# Read PNG files as float RGBA pixels (height, width, 4), bottom row first
+def read_pngs(filepaths):
+    datas = []
+    for filepath in filepaths:
+        with open(filepath, 'rb') as infile:
+            datas.append(infile.read())
+    return decode_pngs(datas)
+
+
+def read_png(filepath):
+    return read_pngs([filepath])[0]
@@ -11,6 +11,8 @@ from bpy_extras.io_utils import ExportHelper, ImportHelper
 from bpy.props import BoolProperty, CollectionProperty, IntProperty, StringProperty, EnumProperty
 from bpy.types import AddonPreferences, Operator, PropertyGroup, UIList
 
+from .brush_assets import brush_asset_cache, brush_asset_index
+from .performance import latency_metrics
 from .tool_data import tool_data as td
 
 
@@ -31,7 +33,7 @@ class GPTOOLWHEEL_OT_AssignHotkey(Operator):
         km.keymap_items.remove(kmi)
 
         # Create new mapping
-        kmi = km.keymap_items.new('gpencil.tool_wheel', type=event.type, value='PRESS',
+        kmi = km.keymap_items.new(get_tool_wheel_idname(), type=event.type, value='PRESS',
                                   alt=event.alt, ctrl=event.ctrl, shift=event.shift, oskey=event.oskey)
         td.keymappings[0] = (km, kmi)
 
@@ -133,6 +135,7 @@ class GPTOOLWHEEL_OT_MoveItem(Operator):
         next_index = prefs.mode_index + (-1 if self.direction == 'up' else 1)
         prefs.mode_order.move(next_index, prefs.mode_index)
         self.move_index()
+        tag_preferences_changed()
         return {'FINISHED'}
 
 
@@ -156,26 +159,16 @@ class GPTOOLWHEEL_OT_SavePrefDefinition(Operator, ExportHelper):
     def execute(self, context):
         # Get prefs
         prefs = context.preferences.addons[__package__].preferences
-        tools = []
-        for tool in prefs.tools:
-            tools.append((tool.mode, tool.tool_index, tool.enabled,
-                         tool.asset_lib_type, tool.asset_lib_id, tool.asset_id))
-        mode_order = []
-        for mode in prefs.mode_order:
-            mode_order.append((mode.name, mode.order, mode.mode))
 
         # Compose data object for json
-        data = {
-            'tools': tools,
-            'mode_order': mode_order,
-            'show_hints': prefs.show_hints,
-            'kmi_wheel': (True,
-                          prefs.kmi_key,
-                          prefs.kmi_alt,
-                          prefs.kmi_ctrl,
-                          prefs.kmi_shift,
-                          prefs.kmi_oskey),
-        }
+        data = get_pref_definition(prefs)
+        data['presets'] = [(preset.name, preset.definition) for preset in prefs.presets]
+        data['kmi_wheel'] = (True,
+                             prefs.kmi_key,
+                             prefs.kmi_alt,
+                             prefs.kmi_ctrl,
+                             prefs.kmi_shift,
+                             prefs.kmi_oskey)
 
         # Write json
         with open(self.filepath, 'w') as outfile:
@@ -186,6 +179,26 @@ class GPTOOLWHEEL_OT_SavePrefDefinition(Operator, ExportHelper):
         return {'FINISHED'}
 
 
+# Operator for exporting the latency samples of the tool wheel
+class GPTOOLWHEEL_OT_ExportLatencySamples(Operator, ExportHelper):
+    '''Export the recorded latency samples to a CSV file'''
+    bl_idname = 'gp_tool_wheel.export_latency_samples'
+    bl_label = 'Export Samples'
+
+    filename_ext = ".csv"
+    filter_glob: StringProperty(
+        default="*.csv",
+        options={'HIDDEN'},
+        maxlen=255,
+    )
+
+    def execute(self, context):
+        latency_metrics.export_csv(self.filepath)
+        self.report({'INFO'}, f'Latency samples exported to {self.filepath}')
+
+        return {'FINISHED'}
+
+
 # Operator for loading preference definition
 class GPTOOLWHEEL_OT_LoadPrefDefinition(Operator, ImportHelper):
     '''Load preference definition from file'''
@@ -212,21 +225,13 @@ class GPTOOLWHEEL_OT_LoadPrefDefinition(Operator, ImportHelper):
             data = json.load(infile)
 
         # Convert data to preference settings
-        prefs.tools.clear()
-        for tool in data['tools']:
-            pref = prefs.tools.add()
-            if len(tool) == 3:
-                # Before version 4.3
-                pref.mode, pref.tool_index, pref.enabled = tool
-            else:
-                # From version 4.3 on
-                pref.mode, pref.tool_index, pref.enabled, pref.asset_lib_type, pref.asset_lib_id, pref.asset_id = tool
-
-        prefs.mode_order.clear()
-        for mode in data['mode_order']:
-            pref = prefs.mode_order.add()
-            pref.name, pref.order, pref.mode = mode
-        prefs.show_hints = data['show_hints']
+        apply_pref_definition(prefs, data)
+        if 'presets' in data:
+            prefs.presets.clear()
+            for name, definition in data['presets']:
+                preset = prefs.presets.add()
+                preset.name, preset.definition = name, definition
+            prefs.active_preset = ''
         (prefs.kmi_is_user_set,
          prefs.kmi_key, prefs.kmi_alt,
          prefs.kmi_ctrl, prefs.kmi_shift, prefs.kmi_oskey) = data['kmi_wheel']
@@ -236,7 +241,7 @@ class GPTOOLWHEEL_OT_LoadPrefDefinition(Operator, ImportHelper):
         km.keymap_items.remove(kmi)
 
         # Create new mapping
-        kmi = km.keymap_items.new('gpencil.tool_wheel', type=prefs.kmi_key, value='PRESS',
+        kmi = km.keymap_items.new(get_tool_wheel_idname(), type=prefs.kmi_key, value='PRESS',
                                   alt=prefs.kmi_alt, ctrl=prefs.kmi_ctrl, shift=prefs.kmi_shift, oskey=prefs.kmi_oskey)
         td.keymappings[0] = (km, kmi)
 
@@ -246,9 +251,15 @@ class GPTOOLWHEEL_OT_LoadPrefDefinition(Operator, ImportHelper):
         # Fill empty preferences with default values
         set_default_preferences()
 
+        tag_preferences_changed()
         context.preferences.is_dirty = True
 
-        self.report({'INFO'}, f'Preference Definition loaded from {self.filepath}')
+        stale_count = sum(1 for pref in prefs.tools if is_stale_asset_preference(pref))
+        if stale_count:
+            self.report({'WARNING'}, f'Preference Definition loaded from {self.filepath}, '
+                                     f'{stale_count} brush asset(s) not found')
+        else:
+            self.report({'INFO'}, f'Preference Definition loaded from {self.filepath}')
 
         return {'FINISHED'}
 
@@ -265,7 +276,10 @@ class GPToolWheel_PG_tool(PropertyGroup):
     # Make sure Blender sees changes in preferences
     # (it doesn't autodetect that for properties in a collection)
     def on_pref_change(self, context):
+        if td.applying_pref_definition:
+            return
         context.preferences.is_dirty = True
+        tag_preferences_changed()
 
     mode: StringProperty()
     tool_index: IntProperty()
@@ -275,16 +289,117 @@ class GPToolWheel_PG_tool(PropertyGroup):
     asset_id: StringProperty(update=on_pref_change)
 
 
+# Preset properties: name and preference definition (json)
+class GPToolWheel_PG_preset(PropertyGroup):
+    name: StringProperty(name='Preset')
+    definition: StringProperty()
+
+
+# Operator for saving the current tools and mode order as named preset
+class GPTOOLWHEEL_OT_SavePreset(Operator):
+    '''Save the current tools and mode order as preset'''
+    bl_idname = 'gp_tool_wheel.save_preset'
+    bl_label = 'Save as Preset'
+
+    name: StringProperty(name='Name', default='Preset')
+
+    def invoke(self, context, _):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        prefs = context.preferences.addons[__package__].preferences
+        if not self.name:
+            self.report({'WARNING'}, 'Preset name is empty')
+            return {'CANCELLED'}
+
+        # Add preset or overwrite the one with the same name
+        preset = prefs.presets.get(self.name)
+        if preset is None:
+            preset = prefs.presets.add()
+            preset.name = self.name
+        preset.definition = json.dumps(get_pref_definition(prefs))
+        prefs.active_preset = self.name
+        tag_preset_applied(prefs)
+        context.preferences.is_dirty = True
+
+        self.report({'INFO'}, f"Preset '{self.name}' saved")
+        return {'FINISHED'}
+
+
+# Operator for removing a preset
+class GPTOOLWHEEL_OT_RemovePreset(Operator):
+    '''Remove preset'''
+    bl_idname = 'gp_tool_wheel.remove_preset'
+    bl_label = 'Remove Preset'
+
+    name: StringProperty(name='Name')
+
+    def execute(self, context):
+        prefs = context.preferences.addons[__package__].preferences
+        index = prefs.presets.find(self.name)
+        if index == -1:
+            return {'CANCELLED'}
+
+        prefs.presets.remove(index)
+        if prefs.active_preset == self.name:
+            prefs.active_preset = ''
+        context.preferences.is_dirty = True
+        return {'FINISHED'}
+
+
+# Operator for switching to the tools and mode order of a preset.
+# Only changed preferences are set and the keyboard shortcut is left alone.
+class GPTOOLWHEEL_OT_SwitchPreset(Operator):
+    '''Switch to the tools and mode order of a preset'''
+    bl_idname = 'gp_tool_wheel.switch_preset'
+    bl_label = 'Switch GP Tool Wheel Preset'
+
+    name: StringProperty(name='Name')
+
+    def execute(self, context):
+        prefs = context.preferences.addons[__package__].preferences
+        preset = prefs.presets.get(self.name)
+        if preset is None:
+            self.report({'WARNING'}, f"Preset '{self.name}' not found")
+            return {'CANCELLED'}
+
+        apply_pref_definition(prefs, json.loads(preset.definition))
+        prefs.active_preset = preset.name
+        tag_preset_applied(prefs)
+        context.preferences.is_dirty = True
+        return {'FINISHED'}
+
+
 # GP Tool Wheel preferences
 class GPToolWheelPreferences(AddonPreferences):
     bl_idname = __package__
 
+    # Options that are part of the wheel model: rebuild the wheel in the background
+    def on_wheel_option_change(self, context):
+        if not td.applying_pref_definition:
+            tag_preferences_changed()
+
     prefs_version: IntProperty(default=1)
     tools: CollectionProperty(name='Wheel Tools', type=GPToolWheel_PG_tool)
-    show_hints: BoolProperty(name='Show Hints', default=True,
+    show_hints: BoolProperty(name='Show Hints', default=True, update=on_wheel_option_change,
                              description='Show tool name when hovering over the tools in the wheel')
+    # Let the keyboard shortcut call the tool wheel variant without undo step for tool switches
+    def on_undo_free_tool_switch_change(self, context):
+        for _, kmi in td.keymappings:
+            kmi.idname = get_tool_wheel_idname()
+
+    undo_free_tool_switch: BoolProperty(name='No Undo Step on Tool Switch', default=False,
+                                        update=on_undo_free_tool_switch_change,
+                                        description='Don\'t add an undo step when switching to another tool in the '
+                                                    'same mode. Mode switches, added objects and brushes loaded '
+                                                    'from an asset library always get an undo step')
+    show_perf_hud: BoolProperty(name='Show Performance HUD', default=False,
+                                description='Show draw time, draw calls, redraw rate and prepare time in the wheel, '
+                                            'for debugging')
     mode_order: CollectionProperty(name='Mode Order', type=GPToolWheel_PG_mode_order)
     mode_index: IntProperty(name='Mode', default=0, description='Mode')
+    presets: CollectionProperty(name='Presets', type=GPToolWheel_PG_preset)
+    active_preset: StringProperty()
 
     kmi_is_user_set: BoolProperty(default=False)
     kmi_key: StringProperty()
@@ -296,8 +411,7 @@ class GPToolWheelPreferences(AddonPreferences):
     # Draw preferences
     def draw(self, _):
         layout = self.layout
-        td.get_active_modes_and_tools()
-        use_brush_assets = (bpy.app.version >= (4, 3, 0))
+        model = get_prefs_panel_model()
 
         # Save preference definition
         box = layout.box()
@@ -309,6 +423,18 @@ class GPToolWheelPreferences(AddonPreferences):
         col.label(text='You can save and load the GP Tool Wheel preferences for backup purposes or', icon='FILE_TICK')
         col.label(text='for distribution to other Blender installations.')
 
+        # Presets
+        box = layout.box()
+        col = box.column(align=True)
+        row = col.row()
+        row.label(text='Presets of tools and mode order:')
+        row.operator('gp_tool_wheel.save_preset')
+        for preset in self.presets:
+            row = col.row(align=True)
+            row.operator('gp_tool_wheel.switch_preset', text=preset.name,
+                         depress=preset.name == self.active_preset).name = preset.name
+            row.operator('gp_tool_wheel.remove_preset', text='', icon='X').name = preset.name
+
         # Keyboard shortcut
         layout.separator(factor=0)
         box = layout.box()
@@ -320,6 +446,32 @@ class GPToolWheelPreferences(AddonPreferences):
         box = layout.box()
         col = box.column()
         col.prop(self, 'show_hints')
+        col.prop(self, 'undo_free_tool_switch')
+
+        # Latency of the wheel, in milliseconds
+        box = layout.box()
+        col = box.column(align=True)
+        row = col.row()
+        row.label(text='Latency (ms):')
+        row.operator('gp_tool_wheel.export_latency_samples')
+        col.prop(self, 'show_perf_hud')
+        col.separator(factor=1.0)
+        grid = col.grid_flow(row_major=True, columns=5, even_columns=True)
+        for label in ['', 'Samples', 'p50', 'p95', 'Max']:
+            grid.label(text=label)
+        for key, label in latency_metrics.METRICS:
+            count, p50, p95, max_ms = latency_metrics.get_stats(key)
+            grid.label(text=label)
+            grid.label(text=str(count))
+            for value in (p50, p95, max_ms):
+                grid.label(text=f'{value:.2f}' if count else '-')
+
+        # Brush asset activations skipped, because the brush was already active
+        if bpy.app.version >= (4, 3, 0):
+            count, skip_rate, loaded_rate = brush_asset_cache.get_stats()
+            col.separator(factor=1.0)
+            col.label(text=f'Brush asset picks: {count}, skipped: {skip_rate:.0f}%, '
+                           f'already loaded: {loaded_rate:.0f}%' if count else 'Brush asset picks: -')
 
         # Mode order
         box = layout.box()
@@ -356,18 +508,14 @@ class GPToolWheelPreferences(AddonPreferences):
         col = box.column(align=True)
         col.label(text='Select the tools you want to appear in the tool wheel.')
         col.label(text='Tip: you can click-and-drag to change multiple values in one sweep.')
-        for mode_i, mode in enumerate(td.modes_in_prefs):
+        for mode_i, (mode_name, tools) in enumerate(model['modes']):
             if mode_i % 3 == 0:
                 box.separator(factor=0.2)
                 grid = box.grid_flow(row_major=True, columns=3, even_columns=True)
             col = grid.column()
-            col.label(text=td.tools_per_mode[mode]['name'])
-            for index in td.tools_per_mode[mode]['tool_order']:
-                tool = td.tools_per_mode[mode]['tools'][index]
-                pref = get_tool_preference(mode, index)
-                name = tool['as_asset']['name'] if use_brush_assets and 'as_asset' in tool and 'name' in tool['as_asset'] \
-                    else tool['name']
-                col.prop(pref, 'enabled', text=name)
+            col.label(text=mode_name)
+            for name, pref_i in tools:
+                col.prop(self.tools[pref_i], 'enabled', text=name)
 
         # Brush assets
         if bpy.app.version < (4, 3, 0):
@@ -385,11 +533,11 @@ class GPToolWheelPreferences(AddonPreferences):
         col.label(text='Draw Mode')
         sub = col.column()
 
-        tool = td.tools_per_mode['draw']['tools'][td.tint_tool_index]
+        name, pref_i = model['draw_assets']
         row = sub.row().split(factor=0.25)
         row.label(text='')
-        row.column().label(text=tool['name'])
-        pref = get_tool_preference('draw', td.tint_tool_index)
+        pref = self.tools[pref_i]
+        row.column().label(text=name, icon='ERROR' if is_stale_asset_preference(pref) else 'NONE')
         sub.prop(pref, 'asset_lib_type', text='Library Type')
         sub.prop(pref, 'asset_lib_id', text='Library')
         sub.prop(pref, 'asset_id', text='Asset')
@@ -399,17 +547,132 @@ class GPToolWheelPreferences(AddonPreferences):
         col.label(text='Sculpt Mode')
         sub = col.column()
 
-        for index, tool in enumerate(td.tools_per_mode['sculpt']['tools']):
-            pref = get_tool_preference('sculpt', index)
+        for name, pref_i in model['sculpt_assets']:
+            pref = self.tools[pref_i]
             row = sub.row().split(factor=0.25)
             row.label(text='')
-            row.column().label(text=tool['name'])
+            row.column().label(text=name, icon='ERROR' if is_stale_asset_preference(pref) else 'NONE')
             sub.prop(pref, 'asset_lib_type', text='Library Type')
             sub.prop(pref, 'asset_lib_id', text='Library')
             sub.prop(pref, 'asset_id', text='Asset')
             sub.separator(factor=1.0)
 
 
+# Is the brush asset of a tool preference known to be missing from its asset library?
+def is_stale_asset_preference(pref):
+    if not pref.asset_id:
+        return False
+    return brush_asset_index.check((pref.asset_lib_type, pref.asset_lib_id, pref.asset_id)) is False
+
+
+# Get preference definition: tools, mode order and wheel options (without keyboard shortcut)
+def get_pref_definition(prefs):
+    return {
+        'tools': [(tool.mode, tool.tool_index, tool.enabled, tool.asset_lib_type, tool.asset_lib_id, tool.asset_id)
+                  for tool in prefs.tools],
+        'mode_order': [(mode.name, mode.order, mode.mode) for mode in prefs.mode_order],
+        'show_hints': prefs.show_hints,
+        'undo_free_tool_switch': prefs.undo_free_tool_switch,
+    }
+
+
+# Apply preference definition in place, only changed values are set.
+# Property updates don't tag each change, the caller tags the preferences once afterwards.
+def apply_pref_definition(prefs, data):
+    td.applying_pref_definition = True
+    try:
+        set_pref_definition(prefs, data)
+    finally:
+        td.applying_pref_definition = False
+
+
+# Set the preferences to the definition
+def set_pref_definition(prefs, data):
+    listed = set()
+    for tool in data['tools']:
+        if len(tool) == 3:
+            # Before version 4.3
+            mode, tool_index, enabled = tool
+            asset = None
+        else:
+            # From version 4.3 on
+            mode, tool_index, enabled, *asset = tool
+            asset = tuple(asset)
+
+        listed.add((mode, tool_index))
+        pref = get_tool_preference(mode, tool_index)
+        if pref is None:
+            pref = prefs.tools.add()
+            pref.mode = mode
+            pref.tool_index = tool_index
+            td.tool_pref_index[(mode, tool_index)] = len(prefs.tools) - 1
+            td.tool_pref_index_state = (prefs.as_pointer(), len(prefs.tools))
+        if pref.enabled != enabled:
+            pref.enabled = enabled
+        if asset is not None and (pref.asset_lib_type, pref.asset_lib_id, pref.asset_id) != asset:
+            pref.asset_lib_type, pref.asset_lib_id, pref.asset_id = asset
+
+    # Tools not in the definition (e.g. a file saved by an older version) are disabled
+    for pref in prefs.tools:
+        if (pref.mode, pref.tool_index) not in listed and pref.enabled:
+            pref.enabled = False
+
+    mode_order = [tuple(mode) for mode in data['mode_order']]
+    if [(mode.name, mode.order, mode.mode) for mode in prefs.mode_order] != mode_order:
+        prefs.mode_order.clear()
+        for mode in mode_order:
+            pref = prefs.mode_order.add()
+            pref.name, pref.order, pref.mode = mode
+
+    prefs.show_hints = data['show_hints']
+    prefs.undo_free_tool_switch = data.get('undo_free_tool_switch', False)
+
+
+# Mark the preferences as set to a preset. The same preset definition gets the same generation,
+# so that switching back to a preset uses the wheel model built for it before.
+def tag_preset_applied(prefs):
+    td.set_preset_generation(json.dumps(get_pref_definition(prefs)))
+
+    from .tool_wheel_operator import schedule_warm_up
+    schedule_warm_up()
+
+
+# Mark the tool preferences as changed, so that the wheel syncs them and is rebuilt in the background
+def tag_preferences_changed():
+    td.new_prefs_generation()
+
+    from .tool_wheel_operator import schedule_warm_up
+    schedule_warm_up()
+
+
+# Get the tool names and preference positions shown in the preferences panel,
+# rebuilt only when the preferences have changed
+def get_prefs_panel_model():
+    td.get_active_modes_and_tools()
+    if td.prefs_panel_generation == td.prefs_generation:
+        return td.prefs_panel_model
+
+    # Make sure the index of tool preferences is up to date
+    rebuild_tool_pref_index(bpy.context.preferences.addons[__package__].preferences)
+
+    modes = []
+    for mode in td.modes_in_prefs:
+        tools = []
+        for index in td.tools_per_mode[mode]['tool_order']:
+            tools.append((td.mode_records[mode].tools[index].name, td.tool_pref_index[(mode, index)]))
+        modes.append((td.tools_per_mode[mode]['name'], tools))
+
+    td.prefs_panel_model = {
+        'modes': modes,
+        'draw_assets': (td.tools_per_mode['draw']['tools'][td.tint_tool_index]['name'],
+                        td.tool_pref_index[('draw', td.tint_tool_index)]),
+        'sculpt_assets': [(tool['name'], td.tool_pref_index[('sculpt', index)])
+                          for index, tool in enumerate(td.tools_per_mode['sculpt']['tools'])],
+    }
+    td.prefs_panel_generation = td.prefs_generation
+    return td.prefs_panel_model
+
+
 # When not set already, set default tool preferences
 def set_default_preferences():
     # Get tool preferences
@@ -424,6 +687,8 @@ def set_default_preferences():
                 pref.mode = mode
                 pref.tool_index = i
                 pref.enabled = tool['default']
+    rebuild_tool_pref_index(addon_prefs)
+    tag_preferences_changed()
 
     # When brush asset data is not set, add it
     for mode in td.modes:
@@ -455,19 +720,63 @@ def set_default_preferences():
         addon_prefs.kmi_oskey = False
 
 
+# Rebuild index of tool preferences: (mode, tool index) -> position in the collection.
+# Duplicate entries are removed on the way, the first one is kept.
+def rebuild_tool_pref_index(prefs):
+    tools = prefs.tools
+    index = {}
+    duplicates = []
+    for i, pref in enumerate(tools):
+        key = (pref.mode, pref.tool_index)
+        if key in index:
+            duplicates.append(i)
+        else:
+            index[key] = i
+
+    # Compact collection when there are duplicates
+    if duplicates:
+        for i in reversed(duplicates):
+            tools.remove(i)
+        index = {(pref.mode, pref.tool_index): i for i, pref in enumerate(tools)}
+        tag_preferences_changed()
+
+    td.tool_pref_index = index
+    td.tool_pref_index_state = (prefs.as_pointer(), len(tools))
+
+
+# Get cheap fingerprint of the preferences: the add-on preferences datablock and the number of tools.
+# It changes when the preferences are replaced outside the add-on's own update callbacks.
+def get_prefs_state():
+    prefs = bpy.context.preferences.addons[__package__].preferences
+    return prefs.as_pointer(), len(prefs.tools)
+
+
 # Get tool preference (by mode and tool index)
 def get_tool_preference(mode, index):
     prefs = bpy.context.preferences.addons[__package__].preferences
-    for pref in prefs.tools:
+    tools = prefs.tools
+    key = (mode, index)
+
+    # Look up in index, when it was built for this tools collection and the entry matches
+    if td.tool_pref_index_state == (prefs.as_pointer(), len(tools)):
+        i = td.tool_pref_index.get(key)
+        if i is None:
+            return None
+        pref = tools[i]
         if pref.mode == mode and pref.tool_index == index:
             return pref
-    return None
+
+    # Index out of date (tools changed or replaced outside the add-on): rebuild it once
+    rebuild_tool_pref_index(prefs)
+    i = td.tool_pref_index.get(key)
+    return None if i is None else tools[i]
 
 
 # Get the tool preferences
 def get_tool_preferences():
     # Get tool preferences
     prefs = bpy.context.preferences.addons[__package__].preferences
+    rebuild_tool_pref_index(prefs)
 
     # Reset list
     for mode in td.modes:
@@ -503,6 +812,9 @@ def get_tool_preferences():
                     asset['asset_library_identifier'] = pref.asset_lib_id
                     asset['relative_asset_identifier'] = pref.asset_id
 
+                td.tool_pref_index[(mode, i)] = len(prefs.tools) - 1
+                td.tool_pref_index_state = (prefs.as_pointer(), len(prefs.tools))
+
     # Get mode order
     td.mode_order = []
     for pref in prefs.mode_order:
@@ -603,6 +915,14 @@ class GPENCIL_OT_link_brush_to_gp_tool_wheel(Operator):
             index = int(self.brush_items_sculpt)
 
         if wheel_tool_asset is not None:
+            # Brush assets stored in the current file can't be found from other files
+            key = (brush_asset.asset_library_type, brush_asset.asset_library_identifier,
+                   brush_asset.relative_asset_identifier)
+            if key[0] == 'LOCAL':
+                self.report({'WARNING'}, f"Brush '{self.brush_name}' is stored in the current file, "
+                                         "it can't be used in the wheel in other files")
+            brush_asset_index.add(key)
+
             wheel_tool_asset['asset_library_type'] = brush_asset.asset_library_type
             wheel_tool_asset['asset_library_identifier'] = brush_asset.asset_library_identifier
             wheel_tool_asset['relative_asset_identifier'] = brush_asset.relative_asset_identifier
@@ -612,6 +932,7 @@ class GPENCIL_OT_link_brush_to_gp_tool_wheel(Operator):
             pref.asset_lib_type = brush_asset.asset_library_type
             pref.asset_lib_id = brush_asset.asset_library_identifier
             pref.asset_id = brush_asset.relative_asset_identifier
+            tag_preferences_changed()
             context.preferences.is_dirty = True
 
         return {'FINISHED'}
@@ -643,6 +964,18 @@ def get_show_hints():
     return bpy.context.preferences.addons[__package__].preferences.show_hints
 
 
+# Get idname of the tool wheel operator for the keyboard shortcut
+def get_tool_wheel_idname():
+    if bpy.context.preferences.addons[__package__].preferences.undo_free_tool_switch:
+        return 'gpencil.tool_wheel_no_undo'
+    return 'gpencil.tool_wheel'
+
+
+# Get show performance HUD preference settings
+def get_show_perf_hud():
+    return bpy.context.preferences.addons[__package__].preferences.show_perf_hud
+
+
 # Assign keyboard shortcut to tool wheel
 def assign_hotkey_to_tool_wheel():
     # Get preferences
@@ -653,7 +986,7 @@ def assign_hotkey_to_tool_wheel():
     if kc:
         # Set keymap item
         km = kc.keymaps.new(name='Object Non-modal', space_type='EMPTY', region_type='WINDOW')
-        kmi = km.keymap_items.new('gpencil.tool_wheel', type=prefs.kmi_key, value='PRESS',
+        kmi = km.keymap_items.new(get_tool_wheel_idname(), type=prefs.kmi_key, value='PRESS',
                                   alt=prefs.kmi_alt, ctrl=prefs.kmi_ctrl, shift=prefs.kmi_shift, oskey=prefs.kmi_oskey)
         td.keymappings.append((km, kmi))
 
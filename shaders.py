@@ -0,0 +1,171 @@
+'''
+GP Tool Wheel
+
+GPU shaders
+'''
+
+import gpu
+
+
+# Color space conversion of the builtin shaders: theme colors are in sRGB and are converted to linear
+# only when drawing to an sRGB framebuffer. Blender sets the 'srgbTarget' uniform when binding a shader.
+SRGB_TARGET_SOURCE = '''
+vec4 srgb_to_framebuffer_space(vec4 srgb_color)
+{
+    if (srgbTarget) {
+        vec3 c = max(srgb_color.rgb, vec3(0.0));
+        srgb_color.rgb = mix(c / 12.92, pow((c + 0.055) / 1.055, vec3(2.4)), step(0.04045, c));
+    }
+    return srgb_color;
+}
+'''
+
+# Fallback tint shader, for Blender versions without the builtin 'IMAGE_COLOR' shader
+TINT_VERTEX_SHADER = '''
+uniform mat4 ModelViewProjectionMatrix;
+
+in vec2 pos;
+in vec2 texCoord;
+out vec2 texCoord_interp;
+
+void main()
+{
+    gl_Position = ModelViewProjectionMatrix * vec4(pos, 0.0, 1.0);
+    texCoord_interp = texCoord;
+}
+'''
+
+TINT_FRAGMENT_SHADER = '''
+uniform sampler2D image;
+uniform vec4 color;
+uniform bool srgbTarget;
+
+in vec2 texCoord_interp;
+out vec4 fragColor;
+''' + SRGB_TARGET_SOURCE + '''
+void main()
+{
+    fragColor = texture(image, texCoord_interp) * srgb_to_framebuffer_space(color);
+}
+'''
+
+shader_cache = {}
+
+
+# Get shader for drawing an alpha mask texture in a uniform color
+# (uniforms: 'image' and 'color', attributes: 'pos' and 'texCoord')
+def get_tint_shader():
+    if 'tint' not in shader_cache:
+        try:
+            shader_cache['tint'] = gpu.shader.from_builtin('IMAGE_COLOR')
+        except ValueError:
+            shader_cache['tint'] = gpu.types.GPUShader(TINT_VERTEX_SHADER, TINT_FRAGMENT_SHADER)
+    return shader_cache['tint']
+
+
+# Shader for anti-aliased rounded boxes with a title bar, a selected state and a hover highlight,
+# drawn from per-vertex attributes: every vertex of a box quad carries the box rectangle and colors
+BOX_VERTEX_SOURCE = '''
+void main()
+{
+    gl_Position = ModelViewProjectionMatrix * vec4(pos, 0.0, 1.0);
+    pos_interp = pos;
+    rect_interp = rect;
+    color_interp = color;
+    color_sel_interp = color_sel;
+    title_color_interp = title_color;
+    title_color_sel_interp = title_color_sel;
+    params_interp = params;
+}
+'''
+
+BOX_FRAGMENT_SOURCE = SRGB_TARGET_SOURCE + '''
+void main()
+{
+    /* Signed distance to the rounded outline, converted to pixel coverage. */
+    vec2 half_size = (rect_interp.zw - rect_interp.xy) * 0.5;
+    float radius = min(params_interp.z, min(half_size.x, half_size.y));
+    vec2 q = max(abs(pos_interp - (rect_interp.xy + half_size)) - (half_size - radius), 0.0);
+    float coverage = clamp(0.5 - (length(q) - radius), 0.0, 1.0);
+
+    /* Box color, title bar color and hover highlight, depending on the selected state. */
+    bool selected = params_interp.w == active_box;
+    vec4 fill = selected ? color_sel_interp : color_interp;
+    if (pos_interp.y >= params_interp.x && pos_interp.y <= params_interp.y) {
+        fill = selected ? title_color_sel_interp : title_color_interp;
+    }
+    if (selected && all(greaterThanEqual(pos_interp, highlight_rect.xy)) &&
+        all(lessThanEqual(pos_interp, highlight_rect.zw)))
+    {
+        fill = highlight_color;
+    }
+
+    fill = srgb_to_framebuffer_space(fill);
+    fragColor = vec4(fill.rgb, fill.a * coverage);
+}
+'''
+
+# Vertex attributes of the box shader: (type, name)
+BOX_ATTRIBUTES = [
+    ('VEC2', 'pos'),
+    ('VEC4', 'rect'),
+    ('VEC4', 'color'),
+    ('VEC4', 'color_sel'),
+    ('VEC4', 'title_color'),
+    ('VEC4', 'title_color_sel'),
+    ('VEC4', 'params'),
+]
+
+# Uniforms of the box shader: (type, name)
+BOX_UNIFORMS = [
+    ('MAT4', 'ModelViewProjectionMatrix'),
+    ('VEC4', 'highlight_rect'),
+    ('VEC4', 'highlight_color'),
+    ('FLOAT', 'active_box'),
+    ('BOOL', 'srgbTarget'),
+]
+
+
+# Get shader for drawing rounded boxes
+# (attributes: 'pos', 'rect' (x0, y0, x1, y1), 'color', 'color_sel', 'title_color', 'title_color_sel' and
+# 'params' (title bar y0, y1, corner radius, box id), uniforms: 'active_box' (box id of the selected box),
+# 'highlight_rect' and 'highlight_color', 'srgbTarget' is set by Blender)
+def get_box_shader():
+    if 'box' not in shader_cache:
+        if hasattr(gpu.types, 'GPUShaderCreateInfo'):
+            shader_cache['box'] = create_box_shader_from_info()
+        else:
+            shader_cache['box'] = create_box_shader_legacy()
+    return shader_cache['box']
+
+
+def create_box_shader_from_info():
+    interface = gpu.types.GPUStageInterfaceInfo('gp_tool_wheel_box_interface')
+    interface.smooth('VEC2', 'pos_interp')
+    for type, name in BOX_ATTRIBUTES[1:]:
+        interface.flat(type, name + '_interp')
+
+    info = gpu.types.GPUShaderCreateInfo()
+    for type, name in BOX_UNIFORMS:
+        info.push_constant(type, name)
+    for i, (type, name) in enumerate(BOX_ATTRIBUTES):
+        info.vertex_in(i, type, name)
+    info.vertex_out(interface)
+    info.fragment_out(0, 'VEC4', 'fragColor')
+    info.vertex_source(BOX_VERTEX_SOURCE)
+    info.fragment_source(BOX_FRAGMENT_SOURCE)
+    return gpu.shader.create_from_info(info)
+
+
+# Fallback for Blender versions without shader create info
+def create_box_shader_legacy():
+    glsl_types = {'VEC2': 'vec2', 'VEC4': 'vec4', 'MAT4': 'mat4', 'FLOAT': 'float', 'BOOL': 'bool'}
+    uniforms = ''.join(f'uniform {glsl_types[type]} {name};\n' for type, name in BOX_UNIFORMS)
+    vertex_code = uniforms + 'out vec2 pos_interp;\n'
+    fragment_code = uniforms + 'in vec2 pos_interp;\nout vec4 fragColor;\n'
+    for type, name in BOX_ATTRIBUTES:
+        vertex_code += f'in {glsl_types[type]} {name};\n'
+    for type, name in BOX_ATTRIBUTES[1:]:
+        vertex_code += f'flat out {glsl_types[type]} {name}_interp;\n'
+        fragment_code += f'flat in {glsl_types[type]} {name}_interp;\n'
+    return gpu.types.GPUShader(vertex_code + BOX_VERTEX_SOURCE, fragment_code + BOX_FRAGMENT_SOURCE)
@@ -0,0 +1,181 @@
+'''
+GP Tool Wheel
+
+Tests of the PNG reader, outside Blender: the bundled icons and generated PNG files
+of all color types, bit depths and filter types, compared with known pixels.
+'''
+
+import glob
+import struct
+import sys
+import zlib
+from os import path
+
+import numpy as np
+import pytest
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import png_reader  # noqa: E402
+
+
+ICONS = sorted(glob.glob(path.join(ROOT, 'icons', '*.png')))
+
+
+# Write PNG chunk
+def chunk(chunk_type, data):
+    return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data))
+
+
+# Apply PNG filter to a scanline, given the previous (unfiltered) scanline
+def filter_scanline(filter_type, line, previous, bpp):
+    out = bytearray()
+    for i, value in enumerate(line):
+        a = line[i - bpp] if i >= bpp else 0
+        b = previous[i]
+        c = previous[i - bpp] if i >= bpp else 0
+        match filter_type:
+            case 0:
+                predictor = 0
+            case 1:
+                predictor = a
+            case 2:
+                predictor = b
+            case 3:
+                predictor = (a + b) // 2
+            case 4:
+                p = a + b - c
+                pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+                predictor = a if pa <= pb and pa <= pc else (b if pb <= pc else c)
+        out.append((value - predictor) & 0xFF)
+    return bytes([filter_type]) + bytes(out)
+
+
+# Encode PNG from packed scanlines (bytes per row), cycling through all filter types
+def encode_png(width, height, color_type, bit_depth, scanlines, bpp, palette=None, transparency=None):
+    data = b''
+    previous = bytes(len(scanlines[0]))
+    for y, line in enumerate(scanlines):
+        data += filter_scanline(y % 5, line, previous, bpp)
+        previous = line
+
+    png = png_reader.PNG_SIGNATURE
+    png += chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, bit_depth, color_type, 0, 0, 0))
+    if palette is not None:
+        png += chunk(b'PLTE', bytes(palette))
+    if transparency is not None:
+        png += chunk(b'tRNS', bytes(transparency))
+    png += chunk(b'IDAT', zlib.compress(data))
+    png += chunk(b'IEND', b'')
+    return png
+
+
+# Pack samples (height, width) of less than a byte into scanlines, highest bits first
+def pack_samples(samples, bit_depth):
+    scanlines = []
+    for row in samples:
+        bits = ''.join(format(int(value), f'0{bit_depth}b') for value in row)
+        bits += '0' * (-len(bits) % 8)
+        scanlines.append(bytes(int(bits[i:i + 8], 2) for i in range(0, len(bits), 8)))
+    return scanlines
+
+
+def decode(data):
+    return png_reader.decode_pngs([data])[0]
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(7)
+
+
+def test_rgba(rng):
+    samples = rng.integers(0, 256, (5, 7, 4), dtype=np.uint8)
+    data = encode_png(7, 5, 6, 8, [row.tobytes() for row in samples], 4)
+    np.testing.assert_allclose(decode(data), samples[::-1] / 255, atol=1e-6)
+
+
+def test_rgb(rng):
+    samples = rng.integers(0, 256, (6, 9, 3), dtype=np.uint8)
+    data = encode_png(9, 6, 2, 8, [row.tobytes() for row in samples], 3)
+    pixels = decode(data)
+    np.testing.assert_allclose(pixels[:, :, 0:3], samples[::-1] / 255, atol=1e-6)
+    assert np.all(pixels[:, :, 3] == 1)
+
+
+def test_rgb_transparent_color():
+    samples = np.array([[[10, 20, 30], [40, 50, 60]]], dtype=np.uint8)
+    data = encode_png(2, 1, 2, 8, [samples[0].tobytes()], 3, transparency=[0, 40, 0, 50, 0, 60])
+    assert decode(data)[0, :, 3].tolist() == [1, 0]
+
+
+def test_grayscale(rng):
+    samples = rng.integers(0, 256, (5, 8), dtype=np.uint8)
+    data = encode_png(8, 5, 0, 8, [row.tobytes() for row in samples], 1)
+    pixels = decode(data)
+    for channel in range(3):
+        np.testing.assert_allclose(pixels[:, :, channel], samples[::-1] / 255, atol=1e-6)
+    assert np.all(pixels[:, :, 3] == 1)
+
+
+def test_grayscale_alpha(rng):
+    samples = rng.integers(0, 256, (4, 6, 2), dtype=np.uint8)
+    data = encode_png(6, 4, 4, 8, [row.tobytes() for row in samples], 2)
+    pixels = decode(data)
+    np.testing.assert_allclose(pixels[:, :, 0], samples[::-1, :, 0] / 255, atol=1e-6)
+    np.testing.assert_allclose(pixels[:, :, 3], samples[::-1, :, 1] / 255, atol=1e-6)
+
+
+@pytest.mark.parametrize('bit_depth', [1, 2, 4])
+def test_grayscale_sub_byte(rng, bit_depth):
+    samples = rng.integers(0, 1 << bit_depth, (5, 11), dtype=np.uint8)
+    data = encode_png(11, 5, 0, bit_depth, pack_samples(samples, bit_depth), 1)
+    np.testing.assert_allclose(decode(data)[:, :, 0], samples[::-1] / ((1 << bit_depth) - 1), atol=1e-6)
+
+
+def test_rgba_16_bit(rng):
+    samples = rng.integers(0, 65536, (4, 5, 4), dtype=np.uint16)
+    data = encode_png(5, 4, 6, 16, [row.astype('>u2').tobytes() for row in samples], 8)
+    np.testing.assert_allclose(decode(data), samples[::-1] / 65535, atol=1e-6)
+
+
+@pytest.mark.parametrize('bit_depth', [1, 2, 4, 8])
+def test_palette_transparency(rng, bit_depth):
+    colors = 1 << bit_depth
+    palette = rng.integers(0, 256, (colors, 3), dtype=np.uint8)
+    transparency = rng.integers(0, 256, colors // 2 + 1, dtype=np.uint8)
+    indices = rng.integers(0, colors, (6, 13), dtype=np.uint8)
+    if bit_depth == 8:
+        scanlines = [row.tobytes() for row in indices]
+    else:
+        scanlines = pack_samples(indices, bit_depth)
+    data = encode_png(13, 6, 3, bit_depth, scanlines, 1, palette=palette.flatten(), transparency=transparency)
+
+    alpha = np.full(colors, 255, dtype=np.uint8)
+    alpha[0:len(transparency)] = transparency
+    pixels = decode(data)
+    np.testing.assert_allclose(pixels[:, :, 0:3], palette[indices[::-1]] / 255, atol=1e-6)
+    np.testing.assert_allclose(pixels[:, :, 3], alpha[indices[::-1]] / 255, atol=1e-6)
+
+
+def test_unsupported_interlace():
+    data = encode_png(1, 1, 0, 8, [b'\x00'], 1).replace(
+        chunk(b'IHDR', struct.pack('>IIBBBBB', 1, 1, 8, 0, 0, 0, 0)),
+        chunk(b'IHDR', struct.pack('>IIBBBBB', 1, 1, 8, 0, 0, 0, 1)))
+    with pytest.raises(ValueError):
+        decode(data)
+
+
+def test_icons_known_pixels():
+    pixels = png_reader.read_png(path.join(ROOT, 'icons', 'add_bone.png'))
+    assert pixels.shape == (96, 96, 4)
+    # Rows are bottom first: pixel (x, y) from the top left is at [95 - y, x]
+    np.testing.assert_allclose(pixels[95, 0] * 255, (255, 255, 255, 0), atol=1e-3)
+    np.testing.assert_allclose(pixels[95 - 16, 16] * 255, (65, 215, 122, 80), atol=1e-3)
+
+
+def test_icons_match_pillow():
+    image_module = pytest.importorskip('PIL.Image')
+    for filepath, pixels in zip(ICONS, png_reader.read_pngs(ICONS)):
+        expected = np.asarray(image_module.open(filepath).convert('RGBA'), dtype=np.float32) / 255
+        np.testing.assert_allclose(pixels, expected[::-1], atol=1e-6, err_msg=filepath)
@@ -5,6 +5,7 @@ GP Tool Wheel
 Specification of all the available Grease Pencil tools and modes
 '''
 
+import math
 from os import path
 
 import bpy
@@ -12,18 +13,86 @@ import gpu
 import numpy as np
 
 from . import preferences
+from .png_reader import read_pngs
+
+
+# Tool in the wheel, resolved for the running Blender version
+class ToolRecord():
+    __slots__ = ('mode', 'index', 'name', 'icon', 'tool_id', 'asset', 'use_asset', 'is_add_tool')
+
+    def __init__(self, mode, index, tool, use_brush_assets):
+        as_asset = tool.get('as_asset') if use_brush_assets else None
+        self.mode = mode
+        self.index = index
+        self.name = tool['name']
+        self.icon = tool['icon']
+        self.tool_id = tool['tool']
+        # Brush asset reference (kept up to date by the preferences and the draw brush tracking)
+        self.asset = as_asset
+        self.use_asset = False
+        if as_asset is not None:
+            self.name = as_asset.get('name', self.name)
+            self.icon = as_asset.get('icon', self.icon)
+            self.tool_id = as_asset['tool']
+            self.use_asset = as_asset['tool'] == ''
+        self.is_add_tool = self.tool_id.startswith('add.')
+
+
+# Mode in the wheel, with the context mode and the callable switching to it,
+# for legacy Grease Pencil objects and for Grease Pencil v3 objects
+class ModeRecord():
+    __slots__ = ('mode', 'name', 'name_short', 'context_mode_legacy', 'context_mode', 'switch_legacy', 'switch',
+                 'paint_settings', 'tools')
+
+    # Tool settings attribute with the paint settings (and active brush) of a mode
+    PAINT_SETTINGS = {
+        'draw': 'gpencil_paint',
+        'sculpt': 'gpencil_sculpt_paint',
+        'vertex': 'gpencil_vertex_paint',
+        'weight': 'gpencil_weight_paint',
+    }
+
+    def __init__(self, mode, mode_obj, switch_legacy, switch, use_brush_assets):
+        self.mode = mode
+        self.name = mode_obj['name']
+        self.name_short = mode_obj['name_short']
+        self.context_mode_legacy = mode_obj['mode']
+        self.context_mode = mode_obj['modev3']
+        self.switch_legacy = switch_legacy
+        self.switch = switch
+        self.paint_settings = self.PAINT_SETTINGS.get(mode)
+        self.tools = tuple(ToolRecord(mode, i, tool, use_brush_assets) for i, tool in enumerate(mode_obj['tools']))
 
 
 class ToolData():
     ICON_PATH = path.sep + 'icons' + path.sep
+    ICON_ATLAS_PADDING = 2
 
     def __init__(self):
         self.keymappings = []
         self.key_button_text = ''
         self.key_button_depress = False
         self.mode_order_labels = []
+        self.tool_pref_index = {}
+        # Preferences state the tool preferences index was built for
+        self.tool_pref_index_state = None
+        self.prefs_generation = 0
+        self.generation_counter = 0
+        self.synced_generation = -1
+        # Preferences state at the last sync, for detecting preferences replaced outside the add-on
+        self.synced_prefs_state = None
+        # Applying a preference definition: changes are tagged once afterwards, not per property
+        self.applying_pref_definition = False
+        # Preferences generation per applied preset definition
+        self.preset_generations = {}
+        self.prefs_panel_model = None
+        self.prefs_panel_generation = -1
         self.active_modes = []
         self.textures = {}
+        self.icon_pixels = {}
+        self.icon_atlas = None
+        self.icon_atlas_size = 0
+        self.icon_uvs = {}
         self.modes = ['weight', 'draw', 'vertex', 'edit', 'sculpt', 'object']
         self.modes_in_prefs = ['draw', 'edit', 'sculpt', 'object', 'vertex', 'weight']
         self.mode_hotkeys = ['ONE', 'TWO', 'THREE', 'FOUR', 'FIVE', 'SIX']
@@ -337,8 +406,61 @@ class ToolData():
             ]
         }
 
+        # Compact records of modes and tools, for the running Blender version
+        self.use_brush_assets = False
+        self.mode_records = {}
+        self.build_tool_registry()
+
+    # Build mode and tool records, so that drawing and switching don't have to look into the tool specification
+    def build_tool_registry(self):
+        # From 4.3 on, use brush assets
+        self.use_brush_assets = (bpy.app.version >= (4, 3, 0))
+
+        # Mode switch operators: (legacy Grease Pencil, Grease Pencil v3)
+        switches = {
+            'object': (lambda: bpy.ops.object.mode_set(mode='OBJECT'),
+                       lambda: bpy.ops.object.mode_set(mode='OBJECT')),
+            'edit': (lambda: bpy.ops.gpencil.editmode_toggle(),
+                     lambda: bpy.ops.object.mode_set(mode='EDIT')),
+            'sculpt': (lambda: bpy.ops.gpencil.sculptmode_toggle(),
+                       lambda: bpy.ops.object.mode_set(mode='SCULPT_GREASE_PENCIL')),
+            'draw': (lambda: bpy.ops.gpencil.paintmode_toggle(),
+                     lambda: bpy.ops.object.mode_set(mode='PAINT_GREASE_PENCIL')),
+            'weight': (lambda: bpy.ops.gpencil.weightmode_toggle(),
+                       lambda: bpy.ops.object.mode_set(mode='WEIGHT_GREASE_PENCIL')),
+            'vertex': (lambda: bpy.ops.gpencil.vertexmode_toggle(),
+                       lambda: bpy.ops.object.mode_set(mode='VERTEX_GREASE_PENCIL')),
+        }
+        self.mode_records = {mode: ModeRecord(mode, self.tools_per_mode[mode], *switches[mode],
+                                             self.use_brush_assets)
+                             for mode in self.modes}
+
+    # Start a new generation of the preferences
+    def new_prefs_generation(self):
+        self.generation_counter += 1
+        self.prefs_generation = self.generation_counter
+
+    # Use the same preferences generation every time the same preset definition is applied,
+    # so that the wheel model built for it is found again
+    def set_preset_generation(self, definition):
+        generation = self.preset_generations.get(definition)
+        if generation is None:
+            self.new_prefs_generation()
+            generation = self.prefs_generation
+            self.preset_generations[definition] = generation
+        self.prefs_generation = generation
+
     # Get active modes and tools (enabled in the preferences)
     def get_active_modes_and_tools(self):
+        # Preferences replaced without the add-on knowing (revert or factory reset of the preferences,
+        # a script filling the tools collection)?
+        if preferences.get_prefs_state() != self.synced_prefs_state:
+            self.new_prefs_generation()
+
+        # Preferences not changed since last sync?
+        if self.synced_generation == self.prefs_generation:
+            return
+
         # Sync tool settings with preferences
         preferences.get_tool_preferences()
 
@@ -384,54 +506,91 @@ class ToolData():
         labels[2][1] = '○'
         self.mode_order_labels = labels
 
-    # Load tool icons as gpu textures
+        # Changes made while syncing are included now
+        self.synced_generation = self.prefs_generation
+        self.synced_prefs_state = preferences.get_prefs_state()
+
+    # Load tool icons and pack them in a texture atlas
     def get_tool_icon_textures(self):
         # Get icon folder in addon directory
         local_dir = path.dirname(path.abspath(__file__)) + self.ICON_PATH
 
-        # Iterate modes and tools
+        # Collect icons of all modes and tools, as resolved for this Blender version
+        icons = list(dict.fromkeys(tool.icon for mode in self.mode_records.values() for tool in mode.tools))
+
+        # Decode icon files straight to pixels (no image datablocks needed)
+        imgs = ['inner_wheel', 'active_dot']
+        pixels = read_pngs([local_dir + icon + '.png' for icon in icons + imgs])
+        self.icon_pixels = dict(zip(icons, pixels))
+
+        # Pack icons in atlas
+        self.build_icon_atlas(round(32 * bpy.context.preferences.system.ui_scale))
+
+        # Create wheel and dot textures as white alpha masks (tinted with theme colors when drawn)
         self.textures = {}
-        for mode in self.modes:
-            mode_obj = self.tools_per_mode[mode]
-            for tool in mode_obj['tools']:
-                icon = tool['icon']
-                # Icon not already loaded?
-                if icon not in self.textures:
-                    # Get image
-                    file = bpy.path.abspath(local_dir + icon + '.png')
-                    img = bpy.data.images.load(file)
+        for icon, img_np in zip(imgs, pixels[len(icons):]):
+            img_np[:, :, 0:3] = 1
+            self.textures[icon] = get_texture_from_pixels(img_np)
 
-                    # Convert to texture
-                    self.textures[icon] = gpu.texture.from_image(img)
+    # Pack all tool icons in one texture, with the icons scaled to their size on screen
+    def build_icon_atlas(self, icon_size):
+        # Atlas already build for this icon size?
+        if self.icon_atlas is not None and self.icon_atlas_size == icon_size:
+            return
 
-                    # Remove image
-                    bpy.data.images.remove(img)
+        # Divide atlas in a grid of cells, with transparent padding around each icon
+        icons = list(self.icon_pixels)
+        cell_size = icon_size + 2 * self.ICON_ATLAS_PADDING
+        columns = math.ceil(math.sqrt(len(icons)))
+        rows = math.ceil(len(icons) / columns)
+        atlas_w = columns * cell_size
+        atlas_h = rows * cell_size
+        atlas = np.zeros((atlas_h, atlas_w, 4), dtype=np.float32)
 
-        # Load wheel and dot images
-        imgs = ['inner_wheel', 'active_dot']
-        img_np = np.empty((96 * 96 * 4), dtype=np.float32)
-        theme = bpy.context.preferences.themes.items()[0][0]
-        pie_colors = bpy.context.preferences.themes[theme].user_interface.wcol_toolbar_item
-        wheel_color = pie_colors.inner[0:3]
-        dot_color = pie_colors.inner_sel[0:3]
-        for icon in imgs:
-            # Load image
-            file = bpy.path.abspath(local_dir + icon + '.png')
-            img = bpy.data.images.load(file)
-
-            # Replace color in image
-            img.pixels.foreach_get(img_np)
-            new_color_img = np.empty((96, 96, 4), dtype=np.float32)
-            new_color_img[:, :, 0:3] = wheel_color if icon == 'inner_wheel' else dot_color
-            new_color_img[:, :, 3] = img_np.reshape((96, 96, 4))[:, :, 3]
-            new_color_img[new_color_img[:, :, 3] == 0] = 0
-            img.pixels.foreach_set(new_color_img.ravel())
-
-            # Convert to texture
-            self.textures[icon] = gpu.texture.from_image(img)
-
-            # Remove image
-            bpy.data.images.remove(img)
+        # Copy icons into atlas and store their uv rectangle
+        self.icon_uvs = {}
+        for i, icon in enumerate(icons):
+            x = (i % columns) * cell_size + self.ICON_ATLAS_PADDING
+            y = (i // columns) * cell_size + self.ICON_ATLAS_PADDING
+            atlas[y:y + icon_size, x:x + icon_size] = get_resized_image(self.icon_pixels[icon], icon_size, icon_size)
+            self.icon_uvs[icon] = (x / atlas_w, y / atlas_h, (x + icon_size) / atlas_w, (y + icon_size) / atlas_h)
+
+        # Convert to texture
+        self.icon_atlas = get_texture_from_pixels(atlas)
+        self.icon_atlas_size = icon_size
+
+
+# Get area averaging weights for resampling a row of pixels
+def get_resample_weights(src_size, dst_size):
+    scale = src_size / dst_size
+    edges = np.arange(dst_size + 1) * scale
+    pixels = np.arange(src_size)
+    overlap = np.minimum(edges[1:, None], pixels[None, :] + 1) - np.maximum(edges[:-1, None], pixels[None, :])
+    return np.clip(overlap, 0, None) / scale
+
+
+# Resize image pixels (h, w, rgba) with area averaging
+def get_resized_image(img_np, w, h):
+    src_h, src_w = img_np.shape[0:2]
+    if src_w == w and src_h == h:
+        return img_np
+
+    # Resample with premultiplied alpha, to avoid dark edges
+    premul = img_np.copy()
+    premul[:, :, 0:3] *= premul[:, :, 3:4]
+    weights_y = get_resample_weights(src_h, h)
+    weights_x = get_resample_weights(src_w, w)
+    resized = np.einsum('yi,ijc,xj->yxc', weights_y, premul, weights_x, optimize=True).astype(np.float32)
+    alpha = resized[:, :, 3:4]
+    np.divide(resized[:, :, 0:3], alpha, out=resized[:, :, 0:3], where=alpha > 0)
+    return np.clip(resized, 0, 1)
+
+
+# Convert image pixels (h, w, rgba, bottom row first) to a gpu texture
+def get_texture_from_pixels(img_np):
+    h, w = img_np.shape[0:2]
+    buffer = gpu.types.Buffer('FLOAT', w * h * 4, np.ascontiguousarray(img_np, dtype=np.float32).ravel())
+    return gpu.types.GPUTexture((w, h), format='SRGB8_A8', data=buffer)
 
 
 tool_data = ToolData()
@@ -5,78 +5,148 @@ Tool wheel drawing
 '''
 
 import math
-import numpy as np
+from collections import deque
+from time import perf_counter
+
 import blf
 import bpy
 import gpu
 from gpu_extras.batch import batch_for_shader
-from gpu_extras.presets import draw_texture_2d
 
-from .preferences import get_show_hints
+from .brush_assets import brush_asset_index, get_asset_key
+from .performance import latency_metrics
+from .preferences import get_show_hints, get_show_perf_hud
+from .shaders import get_box_shader, get_tint_shader
+from . import tool_wheel_layout as layout
 from .tool_data import tool_data as td
 
 
 # Constants
 COLOR_SHADER = 'UNIFORM_COLOR' if bpy.app.version >= (3, 4, 0) else '2D_UNIFORM_COLOR'
+IMAGE_SHADER = 'IMAGE' if bpy.app.version >= (3, 4, 0) else '2D_IMAGE'
 
 
-class ToolButton():
-    BUTTON_IMG_SIZE = 32
-    BUTTON_IMG_PADDING = 2
-    BUTTON_SIZE = BUTTON_IMG_SIZE + 2 * BUTTON_IMG_PADDING + 1
+# Font size of box titles, hotkeys and hints
+FONT_SIZE = 11
+
+# Cache of measured text widths, by (text, font size, ui scale)
+text_widths = {}
+
+
+def set_font_size(size):
+    if bpy.app.version >= (3, 4, 0):
+        blf.size(0, size)
+    else:
+        blf.size(0, size, 72)
 
-    def __init__(self, index, ui_scale):
-        self.x = 0
-        self.y = 0
-        self.w = round(self.BUTTON_IMG_SIZE * ui_scale)
-        self.h = round(self.BUTTON_IMG_SIZE * ui_scale)
-        self.tool_index = index
-        self.separator_right = False
-        self.separator_top = False
+
+# Get width of text, measured only once per text, font size and ui scale
+def get_text_width(text, size, ui_scale):
+    key = (text, size, ui_scale)
+    width = text_widths.get(key)
+    if width is None:
+        set_font_size(size * ui_scale)
+        width, _ = blf.dimensions(0, text)
+        text_widths[key] = width
+    return width
+
+
+class ToolButton():
+    BUTTON_IMG_SIZE = layout.BUTTON_IMG_SIZE
+    BUTTON_IMG_PADDING = layout.BUTTON_IMG_PADDING
+    BUTTON_SIZE = layout.BUTTON_SIZE
+
+    def __init__(self, record, button_layout):
+        self.x = button_layout.x
+        self.y = button_layout.y
+        self.w = button_layout.w
+        self.h = button_layout.h
+        self.tool_index = record.index
+        self.record = record
+        # Brush asset known to be missing from its library
+        self.is_stale = record.use_asset and brush_asset_index.check(get_asset_key(record.asset)) is False
+        self.separator_right = button_layout.separator_right
+        self.separator_top = button_layout.separator_top
 
 
 class ModeBox():
-    BOX_PADDING = 4
-    BUTTONS_PER_ROW = 4
-    TITLE_HEIGHT = 18
-
-    def __init__(self, mode, box_index, tool_count, hotkey, ui_scale):
-        self.x = 0
-        self.y = 0
-        self.row_count = math.ceil(tool_count / self.BUTTONS_PER_ROW)
-        self.w = round((2 * self.BOX_PADDING + self.BUTTONS_PER_ROW * ToolButton.BUTTON_SIZE) * ui_scale)
-        self.h = round((2 * self.BOX_PADDING +
-                        self.row_count * ToolButton.BUTTON_SIZE +
-                        self.TITLE_HEIGHT) * ui_scale)
-        self.upwards = box_index in {0, 1, 2}
-        self.mode = mode
-        self.index = box_index
+    BOX_PADDING = layout.BOX_PADDING
+    BUTTONS_PER_ROW = layout.BUTTONS_PER_ROW
+    TITLE_HEIGHT = layout.TITLE_HEIGHT
+
+    def __init__(self, record, box_layout, tool_indices, hotkey):
+        self.x = box_layout.x
+        self.y = box_layout.y
+        self.w = box_layout.w
+        self.h = box_layout.h
+        self.row_count = box_layout.row_count
+        self.upwards = box_layout.upwards
+        self.mode = record.mode
+        self.record = record
+        self.index = box_layout.index
         self.hotkey = str(hotkey)
-        self.tool_buttons = []
+        self.tool_buttons = [ToolButton(record.tools[tool_i], button_layout)
+                             for tool_i, button_layout in zip(tool_indices, box_layout.buttons)]
+        self.title = record.name
         self.title_x = 0
         self.title_y = 0
-        self.sep_offset = 1 if box_index in {2, 3} else 0
-        self.texture = None
-        self.texture_sel = None
+        self.hotkey_x = 0
+        self.sep_offset = box_layout.sep_offset
+        self.batch_separators = None
 
 
+# Tool wheel, drawn relative to the wheel center (coordinates of boxes and buttons are relative too)
 class ToolWheel():
-    BOX_SPACING = -65
-    BOX_ANGLE = math.radians(3.5)
     HINT_WIDTH = 100
     HINT_HEIGHT = 20
+    CORNER_RADIUS = 4
+    HIT_MAP_STRIDE = layout.HIT_MAP_STRIDE
+    ACTIVE_DOT_RADIUS = 19
+    # Number of positions of the dot on the inner wheel, small enough that moving over a button
+    # rarely moves the dot (and triggers a redraw)
+    ACTIVE_DOT_SECTORS = 32
+    # Color of the marker on tools with a missing brush asset
+    STALE_COLOR = (0.9, 0.3, 0.2, 1.0)
+    # Number of built wheel models kept, for switching between presets without rebuilding
+    MODEL_CACHE_SIZE = 8
+    # Attributes making up a built wheel model
+    MODEL_ATTRIBUTES = ('ui_scale', 'show_hints', 'boxes', 'wheel_layout', 'hit_grid',
+                        'sep_color', 'sep_color_sel', 'text_color', 'highlight_color', 'wheel_color', 'dot_color',
+                        'shader_icon_bg', 'shader_icons', 'shader_tint', 'shader_box', 'batch_separators',
+                        'batch_icons', 'batch_tint', 'batch_boxes', 'batch_hint', 'stale_buttons')
 
     def __init__(self):
         self.center_x = 0
         self.center_y = 0
         self.mouse_x = 0
         self.mouse_y = 0
+        self.ui_scale = 1.0
         self.area = None
         self.boxes = []
-        self.rect_indices = ((0, 1, 2), (2, 1, 3))
         self.show_hints = True
         self.active_mode = ''
         self.active_tool = -1
+        self.batch_separators = None
+        self.batch_icons = None
+        self.batch_boxes = None
+        self.batch_hint = None
+        self.stale_buttons = []
+        self.hit_grid = None
+        self.angle = 0
+        self.angle_sector = -1
+        self.significant_angle = False
+        self.active_box = None
+        self.active_button = None
+        self.invoke_time = None
+        self.wheel_layout = None
+        self.model_key = None
+        self.models = {}
+        self.show_perf_hud = False
+        self.prepare_time = 0
+        self.last_draw_time = 0
+        self.draw_calls = 0
+        self.texture_binds = 0
+        self.frame_times = deque(maxlen=30)
 
     def get_adjusted_color(self, color, perc):
         new_color = [0, 0, 0, color[3]]
@@ -84,179 +154,144 @@ class ToolWheel():
             new_color[i] = max(0, min(1, color[i] + (1 - color[i]) * perc))
         return new_color
 
-    def get_box_rounded_corners(self, img_np, w, h):
-        # Round corners with alpha 0.92, 0.8, 0.25 and 0.0
-        alpha_list = [(0, 0.0), (1, 0.25), (2, 0.8), (3, 0.92)]
-        for d, alpha in alpha_list:
-            for cy in [0, h - 1]:
-                dy = d if cy == 0 else -d
-                for cx in [0, w - 1]:
-                    dx = d if cx == 0 else -d
-                    if alpha == 0:
-                        img_np[cy, cx] = 0
-                    else:
-                        img_np[cy + dy, cx, 3] = alpha
-                        img_np[cy, cx + dx, 3] = alpha
+    # Get batch of box quads for the box shader, every vertex carries the rectangle and colors of its box
+    def get_box_batch(self, rects, params, color, color_sel, title_color, title_color_sel):
+        coords = []
+        for x0, y0, x1, y1 in rects:
+            coords.extend(((x0, y0), (x1, y0), (x0, y1), (x1, y1)))
+        vertex_count = len(coords)
+        content = {
+            'pos': coords,
+            'rect': [rect for rect in rects for _ in range(4)],
+            'color': [color] * vertex_count,
+            'color_sel': [color_sel] * vertex_count,
+            'title_color': [title_color] * vertex_count,
+            'title_color_sel': [title_color_sel] * vertex_count,
+            'params': [param for param in params for _ in range(4)],
+        }
+        return batch_for_shader(self.shader_box, 'TRIS', content, indices=self.get_quad_indices(len(rects)))
+
+    def draw_tinted_mask(self, texture, color, x, y, w, h):
+        self.draw_calls += 1
+        self.texture_binds += 1
+        gpu.matrix.push()
+        gpu.matrix.translate((x, y))
+        gpu.matrix.scale((w, h))
+        self.shader_tint.bind()
+        self.shader_tint.uniform_sampler('image', texture)
+        self.shader_tint.uniform_float('color', color)
+        self.batch_tint.draw(self.shader_tint)
+        gpu.matrix.pop()
+
+    def get_quad_indices(self, quad_count, offset=0):
+        indices = []
+        for i in range(offset, offset + quad_count * 4, 4):
+            indices.extend(((i, i + 1, i + 2), (i + 1, i + 2, i + 3)))
+        return indices
+
+    # Resolve the active mode and tool under the mouse cursor
+    def update_hover(self, mouse_x, mouse_y):
+        self.mouse_x = mouse_x
+        self.mouse_y = mouse_y
+        self.active_box = None
+        self.active_button = None
 
-    def prepare(self, event, area, context):
-        box: ModeBox
+        # Get active mode, based on angle of mouse in the wheel
+        dx = mouse_x - self.center_x
+        dy = mouse_y - self.center_y
+        self.significant_angle = abs(dx) > 3 or abs(dy) > 3
+        angle = math.degrees(math.atan2(dy, dx))
+        if angle < 0:
+            angle += 360
+        self.angle = angle
+        if self.significant_angle:
+            active_box_index = td.box_by_angle[int(angle // 45)]
+            for box in self.boxes:
+                if box.index == active_box_index:
+                    self.active_box = box
 
-        # Init
-        self.active_mode = ''
-        self.active_tool = -1
+        # Override: box is active when mouse is pointing at it
+        hit = layout.get_hit(self.hit_grid, round(dx), round(dy))
+        if hit >= 0:
+            self.active_box = self.boxes[hit // self.HIT_MAP_STRIDE]
+            button_i = hit % self.HIT_MAP_STRIDE - 1
+            if button_i >= 0:
+                self.active_button = self.active_box.tool_buttons[button_i]
+
+        # Sector of the dot on the inner wheel. Over a tool button the dot points at the button,
+        # so that moving within the button doesn't move the dot.
+        if self.active_button is not None:
+            button = self.active_button
+            angle = math.degrees(math.atan2(button.y - button.h * 0.5, button.x + button.w * 0.5)) % 360
+        self.angle_sector = int(angle / 360 * self.ACTIVE_DOT_SECTORS) % self.ACTIVE_DOT_SECTORS \
+            if self.significant_angle else -1
+
+        self.active_mode = '' if self.active_box is None else self.active_box.mode
+        self.active_tool = -1 if self.active_button is None else self.active_button.tool_index
+
+    # Get the hover state that determines what the wheel looks like: active mode, tool
+    # and the angle sector of the dot in the inner wheel
+    def get_hover_state(self):
+        return (self.active_mode, self.active_tool, self.angle_sector)
+
+    def get_theme_colors(self, context):
+        theme = context.preferences.themes.items()[0][0]
+        return context.preferences.themes[theme].user_interface.wcol_toolbar_item
+
+    # Get the values the wheel model is built from: preferences, brush asset index, ui scale and theme colors
+    def get_model_key(self, context):
+        wheel_colors = self.get_theme_colors(context)
+        return (td.prefs_generation, brush_asset_index.generation, context.preferences.system.ui_scale,
+                get_show_hints(), tuple(wheel_colors.inner), tuple(wheel_colors.inner_sel), tuple(wheel_colors.outline),
+                tuple(wheel_colors.text))
+
+    # Build the wheel model: boxes, buttons and batches, relative to the wheel center.
+    # The model is kept until preferences, ui scale or theme change, so it can be built ahead of an invocation.
+    def build(self, context):
+        box: ModeBox
         ui_scale = context.preferences.system.ui_scale
-
-        # Store area and wheel center
-        self.area = area
-        self.center_x = event.mouse_region_x
-        self.center_y = event.mouse_region_y
-        self.mouse_x = event.mouse_region_x
-        self.mouse_y = event.mouse_region_y
-
-        # Get show hints preference
+        self.ui_scale = ui_scale
         self.show_hints = get_show_hints()
 
         # Get active modes and tools
         td.get_active_modes_and_tools()
+        model_key = self.get_model_key(context)
 
-        # Create draw boxes for active modes
-        self.boxes = []
-        for mode, box_index, hotkey in td.active_modes:
-            tool_count = len(td.tools_per_mode[mode]['active_tools'])
-            box = ModeBox(mode, box_index, tool_count, hotkey, ui_scale)
-            self.boxes.append(box)
+        # Get layout of the boxes for the active modes, relative to the wheel center
+        box_specs = tuple((box_index, len(td.tools_per_mode[mode]['active_tools']))
+                          for mode, box_index, _ in td.active_modes)
+        self.wheel_layout = layout.get_wheel_layout(box_specs, ui_scale)
 
         # No active modes (unlikely, but we have to check)
-        if len(self.boxes) == 0:
+        self.boxes = []
+        self.model_key = None
+        if self.wheel_layout is None:
             return False
 
-        # Position boxes
-        box_w = self.boxes[0].w
-        box_w_half = int(box_w * 0.5)
-        wheel_radius = box_w + self.BOX_SPACING * ui_scale
-        dx = math.cos(self.BOX_ANGLE) * wheel_radius
-        dy = math.sin(self.BOX_ANGLE) * wheel_radius
-        wheel_radius = int(wheel_radius * 0.5)
-        min_x = math.inf
-        min_y = math.inf
-        max_x = -math.inf
-        max_y = -math.inf
-        for box in self.boxes:
-            # Position box in wheel
-            match box.index:
-                case 0:
-                    box.x = -dx - box_w
-                    box.y = dy + box.h
-                case 1:
-                    box.x = -box_w_half
-                    box.y = wheel_radius + box.h
-                case 2:
-                    box.x = dx
-                    box.y = dy + box.h
-                case 3:
-                    box.x = dx
-                    box.y = -dy
-                case 4:
-                    box.x = -box_w_half
-                    box.y = -wheel_radius
-                case 5:
-                    box.x = -dx - box_w
-                    box.y = -dy
-
-            # Apply cursor coordinates
-            box.x += event.mouse_region_x
-            box.y += event.mouse_region_y
-
-            # Get bounding box
-            min_x = min(min_x, box.x)
-            min_y = min(min_y, box.y - box.h)
-            max_x = max(max_x, box.x + box.w)
-            max_y = max(max_y, box.y)
-
-        # Get width of toolbar and n-panel
-        left_padding = 3
-        right_padding = 3
-        for region in area.regions:
-            if region.alignment == 'LEFT' and region.width > left_padding:
-                left_padding = region.width
-            if region.alignment == 'RIGHT' and region.width > right_padding:
-                right_padding = region.width
-
-        # Get height of tool header and brush asset shelf
-        top_padding = 2
-        bottom_padding = 2
-        for region in area.regions:
-            if region.type in ['HEADER', 'TOOL_HEADER']:
-                top_padding += region.height
-            if region.type in ['ASSET_SHELF', 'ASSET_SHELF_HEADER']:
-                bottom_padding += region.height
-
-        # Make sure bounding box is within area bounds
-        dx = 0
-        dy = 0
-        if min_x < left_padding:
-            dx = left_padding - min_x
-            max_x += dx
-        if max_x > area.width - right_padding:
-            dx = area.width - right_padding - max_x
-        if min_y < bottom_padding:
-            dy = bottom_padding - min_y
-            max_y += dy
-        if max_y > area.height - top_padding:
-            dy = area.height - top_padding - max_y
-
-        # Adjust xy of boxes if not within area bounds
-        if dx != 0 or dy != 0:
-            self.center_x += dx
-            self.center_y += dy
-            for box in self.boxes:
-                box.x += dx
-                box.y += dy
-
-        # Create buttons within boxes
-        padding = ModeBox.BOX_PADDING * ui_scale
-        bsize = ToolButton.BUTTON_SIZE * ui_scale
-        for box in self.boxes:
-            box.tool_buttons = []
-            right_to_left = box.index in {0, 5}
-            row = 0
-            column = ModeBox.BUTTONS_PER_ROW - 1 if right_to_left else 0
-            dir = -1 if right_to_left else 1
-            for tool_i in td.tools_per_mode[box.mode]['active_tools']:
-                # Create button
-                button = ToolButton(tool_i, ui_scale)
-
-                # Calculate position
-                button.x = box.x + padding + bsize * column
-                if box.upwards:
-                    button.y = box.y - box.h + padding + bsize * (row + 1)
-                else:
-                    button.y = box.y - padding - bsize * row
-
-                # Line separator on the right and top?
-                button.separator_right = column != ModeBox.BUTTONS_PER_ROW - 1
-                button.separator_top = column == 0 and ((box.upwards and row < box.row_count - 1)
-                                                        or (not box.upwards and row > 0))
-
-                # Append button to mode box
-                box.tool_buttons.append(button)
-
-                # Increase column (and row)
-                column += dir
-                if column >= ModeBox.BUTTONS_PER_ROW or column < 0:
-                    column = ModeBox.BUTTONS_PER_ROW - 1 if right_to_left else 0
-                    row += 1
-
-            # Set position of box title
-            box.title_x = box.x + box.BOX_PADDING * ui_scale
+        # Create draw boxes for active modes
+        for (mode, _, hotkey), box_layout in zip(td.active_modes, self.wheel_layout.boxes):
+            box = ModeBox(td.mode_records[mode], box_layout, td.tools_per_mode[mode]['active_tools'], hotkey)
+
+            # Set position of centered box title and hotkey on the right
+            tw = get_text_width(box.title, FONT_SIZE, ui_scale)
+            box.title_x = box.x + int((box.w - tw) * 0.5)
+            tw = get_text_width(box.hotkey, FONT_SIZE, ui_scale)
+            box.hotkey_x = box.x + box.w - ModeBox.BOX_PADDING * 2 * ui_scale - tw
             if box.upwards:
                 box.title_y = box.y - box.BOX_PADDING * ui_scale - ModeBox.TITLE_HEIGHT * ui_scale + 7 * ui_scale
             else:
                 box.title_y = box.y - box.h + box.BOX_PADDING * ui_scale + 3
 
+            self.boxes.append(box)
+
+        # Tools with a missing brush asset, marked in the wheel
+        self.stale_buttons = [button for box in self.boxes for button in box.tool_buttons if button.is_stale]
+
+        # Grid for finding the box and button under the mouse cursor
+        self.hit_grid = self.wheel_layout.hit_grid
+
         # Get pie menu colors from active theme
-        theme = context.preferences.themes.items()[0][0]
-        wheel_colors = context.preferences.themes[theme].user_interface.wcol_toolbar_item
+        wheel_colors = self.get_theme_colors(context)
         base_color = list(wheel_colors.inner)[0:3] + [1]
         hint_color = self.get_adjusted_color(base_color, 0.25)
         hint_color[3] = 0.98
@@ -268,77 +303,157 @@ class ToolWheel():
         self.sep_color_sel = self.get_adjusted_color(self.sep_color, -0.07)
         self.text_color = wheel_colors.text
         self.highlight_color = self.get_adjusted_color(base_color, 0.07)
+        self.wheel_color = list(wheel_colors.inner)[0:3] + [1]
+        self.dot_color = list(wheel_colors.inner_sel)[0:3] + [1]
 
         # Init shaders
         self.shader_icon_bg = gpu.shader.from_builtin(COLOR_SHADER)
         self.shader_icon_bg.bind()
 
-        # Create icon background batch
-        bsize = ToolButton.BUTTON_IMG_SIZE * ui_scale
-        verts = ((0, 0), (bsize, 0), (0, -bsize), (bsize, -bsize))
-        self.batch_icon_bg = batch_for_shader(self.shader_icon_bg, 'TRIS', {'pos': verts}, indices=self.rect_indices)
-
-        # Create textures with rounded corners for mode boxes
+        # Create separator line batches, one for all boxes and one per box
+        # (for drawing the selected box on top in another color)
+        all_coords = []
+        for box, box_layout in zip(self.boxes, self.wheel_layout.boxes):
+            coords = box_layout.separator_coords
+            box.batch_separators = batch_for_shader(self.shader_icon_bg, 'TRIS', {'pos': coords},
+                                                    indices=self.get_quad_indices(len(coords) // 4))
+            all_coords.extend(coords)
+        self.batch_separators = batch_for_shader(self.shader_icon_bg, 'TRIS', {'pos': all_coords},
+                                                 indices=self.get_quad_indices(len(all_coords) // 4))
+
+        # Create one batch for all tool icons, with uv coordinates in the icon atlas
+        td.build_icon_atlas(round(ToolButton.BUTTON_IMG_SIZE * ui_scale))
+        self.shader_icons = gpu.shader.from_builtin(IMAGE_SHADER)
+        ipad = ToolButton.BUTTON_IMG_PADDING * ui_scale
+        coords = []
+        uvs = []
         for box in self.boxes:
-            # Create image
-            img = bpy.data.images.new('temp_gp_tool_wheel', box.w, box.h, alpha=True)
-            img_np = np.empty((box.h, box.w, 4), dtype=np.float32)
-
-            for sel in range(2):
-                # Fill with box color
-                img_np[:, :] = box_color if sel == 0 else box_color_sel
-
-                # Darken title area
-                color = box_title_bg if sel == 0 else box_title_bg_sel
-                title_h = round((ModeBox.TITLE_HEIGHT + 2) * ui_scale)
-                if box.upwards:
-                    img_np[-title_h:] = color
-                else:
-                    img_np[0:title_h] = color
-
-                # Get rounded corners
-                self.get_box_rounded_corners(img_np, box.w, box.h)
-                img.pixels.foreach_set(img_np.ravel())
-
-                # Convert to texture
-                if sel == 0:
-                    box.texture = gpu.texture.from_image(img)
-                else:
-                    box.texture_sel = gpu.texture.from_image(img)
-
-            # Remove image
-            bpy.data.images.remove(img)
-
-        # Create texture for hint box
+            for button in box.tool_buttons:
+                u0, v0, u1, v1 = td.icon_uvs[button.record.icon]
+                x = round(button.x + ipad)
+                y = round(button.y - button.h - ipad)
+                coords.extend(((x, y), (x + button.w, y), (x, y + button.h), (x + button.w, y + button.h)))
+                uvs.extend(((u0, v0), (u1, v0), (u0, v1), (u1, v1)))
+        self.batch_icons = batch_for_shader(self.shader_icons, 'TRIS', {'pos': coords, 'texCoord': uvs},
+                                            indices=self.get_quad_indices(len(coords) // 4))
+
+        # Create unit quad batch for drawing tinted masks (inner wheel and dots)
+        self.shader_tint = get_tint_shader()
+        verts = ((0, 0), (1, 0), (0, 1), (1, 1))
+        self.batch_tint = batch_for_shader(self.shader_tint, 'TRIS', {'pos': verts, 'texCoord': verts},
+                                           indices=self.get_quad_indices(1))
+
+        # Create one batch for all mode boxes, drawn with title bar and selected state by the box shader
+        self.shader_box = get_box_shader()
+        title_h = round((ModeBox.TITLE_HEIGHT + 2) * ui_scale)
+        radius = self.CORNER_RADIUS * ui_scale
+        rects = []
+        params = []
+        for box_i, box in enumerate(self.boxes):
+            if box.upwards:
+                title_y0, title_y1 = box.y - title_h, box.y
+            else:
+                title_y0, title_y1 = box.y - box.h, box.y - box.h + title_h
+            rects.append((box.x, box.y - box.h, box.x + box.w, box.y))
+            params.append((title_y0, title_y1, radius, box_i))
+        self.batch_boxes = self.get_box_batch(rects, params, box_color, box_color_sel, box_title_bg, box_title_bg_sel)
+
+        # Create batch for hint box (never selected and without title bar)
+        self.batch_hint = None
         if self.show_hints:
-            # Create image
             hint_w = round(self.HINT_WIDTH * ui_scale)
             hint_h = round(self.HINT_HEIGHT * ui_scale)
-            img = bpy.data.images.new('temp_gp_tool_wheel', hint_w, hint_h, alpha=True)
-            img_np = np.empty((hint_h, hint_w, 4), dtype=np.float32)
+            rect = (-hint_w * 0.5, -hint_h * 0.5, hint_w * 0.5, hint_h * 0.5)
+            self.batch_hint = self.get_box_batch([rect], [(1, 0, radius, -2)], hint_color, hint_color,
+                                                 hint_color, hint_color)
+
+        self.model_key = model_key
+        self.store_model()
+        return True
 
-            # Fill with box color
-            img_np[:, :] = hint_color
+    # Keep the built wheel model, together with the icon atlas its uv coordinates refer to
+    def store_model(self):
+        self.models.pop(self.model_key, None)
+        if len(self.models) >= self.MODEL_CACHE_SIZE:
+            del self.models[next(iter(self.models))]
+        model = {name: getattr(self, name) for name in self.MODEL_ATTRIBUTES}
+        model['icon_atlas'] = td.icon_atlas
+        self.models[self.model_key] = model
+
+    # Use a previously built wheel model, returns False when there is none for this key
+    def restore_model(self, model_key):
+        model = self.models.get(model_key)
+        if model is None or model['icon_atlas'] is not td.icon_atlas:
+            return False
+        for name in self.MODEL_ATTRIBUTES:
+            setattr(self, name, model[name])
+        self.model_key = model_key
+        return True
 
-            # Get rounded corners
-            self.get_box_rounded_corners(img_np, hint_w, hint_h)
-            img.pixels.foreach_set(img_np.ravel())
+    # Get wheel model up to date: use a previously built one or build it
+    def update_model(self, context):
+        td.get_active_modes_and_tools()
+        model_key = self.get_model_key(context)
+        if self.model_key == model_key or self.restore_model(model_key):
+            return True
+        return self.build(context)
 
-            # Convert to texture
-            self.hint_texture = gpu.texture.from_image(img)
+    # Place the wheel at the mouse cursor, (re)building the wheel model only when it is outdated
+    def prepare(self, event, area, context):
+        start_time = perf_counter()
+
+        # Init
+        self.active_mode = ''
+        self.active_tool = -1
+        self.show_perf_hud = get_show_perf_hud()
+        self.frame_times.clear()
 
-            # Remove image
-            bpy.data.images.remove(img)
+        # Build wheel model, when not done ahead
+        if not self.update_model(context):
+            return False
+
+        # Store area and wheel center
+        self.area = area
+        self.center_x = event.mouse_region_x
+        self.center_y = event.mouse_region_y
+        self.mouse_x = event.mouse_region_x
+        self.mouse_y = event.mouse_region_y
+
+        # Get width of toolbar and n-panel
+        left_padding = 3
+        right_padding = 3
+        for region in area.regions:
+            if region.alignment == 'LEFT' and region.width > left_padding:
+                left_padding = region.width
+            if region.alignment == 'RIGHT' and region.width > right_padding:
+                right_padding = region.width
 
+        # Get height of tool header and brush asset shelf
+        top_padding = 2
+        bottom_padding = 2
+        for region in area.regions:
+            if region.type in ['HEADER', 'TOOL_HEADER']:
+                top_padding += region.height
+            if region.type in ['ASSET_SHELF', 'ASSET_SHELF_HEADER']:
+                bottom_padding += region.height
+
+        # Move wheel center when the wheel is not within area bounds
+        dx, dy = layout.get_clamp_offset(self.wheel_layout.bounds, self.center_x, self.center_y,
+                                         area.width, area.height,
+                                         (left_padding, right_padding, bottom_padding, top_padding))
+        self.center_x += dx
+        self.center_y += dy
+        self.update_hover(self.mouse_x, self.mouse_y)
+
+        self.prepare_time = perf_counter() - start_time
         return True
 
+    # Wheel closed (the wheel model is kept for the next invocation)
     def end(self):
-        # Delete shaders and textures
-        self.shader_icon_bg = None
-        self.batch_icon_bg = None
-        for box in self.boxes:
-            del box.texture
-            del box.texture_sel
+        self.area = None
+        self.invoke_time = None
+        self.active_box = None
+        self.active_button = None
 
     def draw(self, context):
         box: ModeBox
@@ -347,113 +462,71 @@ class ToolWheel():
         # Drawing in the area the tool wheel was invoked?
         if context.area != self.area:
             return
+        start_time = perf_counter()
+        self.frame_times.append(start_time)
+        self.draw_calls = 0
+        self.texture_binds = 0
 
         # Inits
         ui_scale = context.preferences.system.ui_scale
-        ipad = ToolButton.BUTTON_IMG_PADDING * ui_scale
         gpu.state.blend_set('ALPHA')
         gpu.state.line_width_set(1.0)
-        self.active_mode = ''
-        use_brush_assets = (bpy.app.version >= (4, 3, 0))
-
-        # Get active mode, based on angle of mouse in the wheel
-        dx = self.mouse_x - self.center_x
-        dy = self.mouse_y - self.center_y
-        significant_angle = abs(dx) > 3 or abs(dy) > 3
-        angle = math.degrees(math.atan2(dy, dx))
-        if angle < 0:
-            angle += 360
-        active_box_index = td.box_by_angle[int(angle // 45)] if significant_angle else -1
-        for box in self.boxes:
-            if box.index == active_box_index:
-                self.active_mode = box.mode
+        active_box = self.active_box
 
-        # Override: box is active when mouse is pointing at it
-        active_box = None
-        for box in self.boxes:
-            if (box.x <= self.mouse_x <= box.x + box.w and
-                    box.y - box.h <= self.mouse_y <= box.y):
-                self.active_mode = box.mode
-            if self.active_mode == box.mode:
-                active_box = box
+        # Draw relative to the wheel center
+        gpu.matrix.push()
+        gpu.matrix.translate((self.center_x, self.center_y))
 
         # Draw center wheel
-        draw_texture_2d(td.textures['inner_wheel'], (self.center_x - 24 * ui_scale,
-                        self.center_y - 24 * ui_scale), 48 * ui_scale, 48 * ui_scale)
-
-        # Iterate boxes (modes)
-        active_tool = -1
-        for box in self.boxes:
-            # Draw box (in selected state or not)
-            box_is_selected = box.mode == self.active_mode
-            texture = box.texture_sel if box_is_selected else box.texture
-            draw_texture_2d(texture, (box.x, box.y - box.h), box.w, box.h)
-
-            # Draw tool buttons
-            for button in box.tool_buttons:
-                # Get tool
-                tool = td.tools_per_mode[box.mode]['tools'][button.tool_index]
-
-                # Is the icon active (mouse pointing at it)?
-                is_active = (button.x <= self.mouse_x <= button.x + button.BUTTON_SIZE * ui_scale and
-                             button.y - button.BUTTON_SIZE * ui_scale <= self.mouse_y <= button.y)
-                if is_active:
-                    active_tool = button.tool_index
-
-                # Draw tool icon background
-                if is_active:
-                    gpu.matrix.push()
-                    gpu.matrix.translate((button.x + button.BUTTON_IMG_PADDING * ui_scale,
-                                         button.y - button.BUTTON_IMG_PADDING * ui_scale))
-                    color = self.highlight_color
-                    self.shader_icon_bg.uniform_float('color', color)
-                    self.batch_icon_bg.draw(self.shader_icon_bg)
-                    gpu.matrix.pop()
-
-                # Draw tool icon
-                icon = tool['icon']
-                if use_brush_assets and 'as_asset' in tool and 'icon' in tool['as_asset']:
-                    icon = tool['as_asset']['icon']
-                texture = td.textures[icon]
-                x = button.x + ipad
-                y = button.y - button.h - ipad
-                draw_texture_2d(texture, (x, y), button.w, button.h)
-
-                # Draw separator lines
-                if button.separator_right or button.separator_top:
-                    coords = []
-                    if button.separator_right:
-                        x0 = round(button.x + button.w + ModeBox.BOX_PADDING * ui_scale + box.sep_offset)
-                        y0 = round(button.y - ModeBox.BOX_PADDING * ui_scale)
-                        y1 = round(button.y - button.h)
-                        coords.append((x0, y0))
-                        coords.append((x0 - 1, y0))
-                        coords.append((x0, y1))
-                        coords.append((x0 - 1, y1))
-                    if button.separator_top:
-                        x0 = round(box.x + ModeBox.BOX_PADDING * ui_scale + box.sep_offset)
-                        x1 = round(box.x + box.w - ModeBox.BOX_PADDING * ui_scale + box.sep_offset)
-                        y0 = round(button.y + box.sep_offset)
-                        coords.append((x0, y0))
-                        coords.append((x0, y0 + 1))
-                        coords.append((x1, y0))
-                        coords.append((x1, y0 + 1))
-
-                    indices = ((0, 1, 2), (1, 2, 3), (4, 5, 6), (5, 6, 7)
-                               ) if button.separator_right and button.separator_top else ((0, 1, 2), (1, 2, 3))
-                    batch = batch_for_shader(self.shader_icon_bg, 'TRIS', {'pos': coords}, indices=indices)
-                    color = self.sep_color_sel if box_is_selected else self.sep_color
-                    self.shader_icon_bg.uniform_float('color', color)
-                    batch.draw(self.shader_icon_bg)
-
-        self.active_tool = active_tool
+        self.draw_tinted_mask(td.textures['inner_wheel'], self.wheel_color, -24 * ui_scale,
+                              -24 * ui_scale, 48 * ui_scale, 48 * ui_scale)
+
+        # Draw boxes (modes) in one pass, with the selected box and
+        # the icon background of the active tool (mouse pointing at it)
+        highlight_rect = (0, 0, -1, -1)
+        button = self.active_button
+        if button is not None:
+            x = button.x + button.BUTTON_IMG_PADDING * ui_scale
+            y = button.y - button.BUTTON_IMG_PADDING * ui_scale
+            bsize = button.BUTTON_IMG_SIZE * ui_scale
+            highlight_rect = (x, y - bsize, x + bsize, y)
+        self.shader_box.bind()
+        self.shader_box.uniform_float('active_box', -1 if active_box is None else self.boxes.index(active_box))
+        self.shader_box.uniform_float('highlight_rect', highlight_rect)
+        self.shader_box.uniform_float('highlight_color', self.highlight_color)
+        self.batch_boxes.draw(self.shader_box)
+        self.draw_calls += 1
+
+        # Draw all tool icons at once
+        self.shader_icons.bind()
+        self.shader_icons.uniform_sampler('image', td.icon_atlas)
+        self.batch_icons.draw(self.shader_icons)
+        self.draw_calls += 1
+        self.texture_binds += 1
+
+        # Mark tools with a missing brush asset with a dot in the top right corner of the icon
+        for button in self.stale_buttons:
+            bsize = button.BUTTON_IMG_SIZE * ui_scale
+            dx = button.x + button.BUTTON_IMG_PADDING * ui_scale + bsize - 5 * ui_scale
+            dy = button.y - button.BUTTON_IMG_PADDING * ui_scale - 5 * ui_scale
+            self.draw_tinted_mask(td.textures['active_dot'], self.STALE_COLOR, dx, dy, 6 * ui_scale, 6 * ui_scale)
+
+        # Draw separator lines (all boxes at once, selected box on top)
+        self.shader_icon_bg.bind()
+        self.shader_icon_bg.uniform_float('color', self.sep_color)
+        self.batch_separators.draw(self.shader_icon_bg)
+        self.draw_calls += 1
+        if active_box is not None:
+            self.shader_icon_bg.uniform_float('color', self.sep_color_sel)
+            active_box.batch_separators.draw(self.shader_icon_bg)
+            self.draw_calls += 1
 
         # Draw dot on inner wheel
-        if significant_angle:
-            angle = math.radians(angle)
-            dx = self.center_x + math.cos(angle) * 19 * ui_scale - 4 * ui_scale
-            dy = self.center_y + math.sin(angle) * 19 * ui_scale - 4 * ui_scale
-            draw_texture_2d(td.textures['active_dot'], (dx, dy), 8 * ui_scale, 8 * ui_scale)
+        if self.significant_angle:
+            angle = math.radians((self.angle_sector + 0.5) * 360 / self.ACTIVE_DOT_SECTORS)
+            dx = math.cos(angle) * self.ACTIVE_DOT_RADIUS * ui_scale - 4 * ui_scale
+            dy = math.sin(angle) * self.ACTIVE_DOT_RADIUS * ui_scale - 4 * ui_scale
+            self.draw_tinted_mask(td.textures['active_dot'], self.dot_color, dx, dy, 8 * ui_scale, 8 * ui_scale)
 
         # Draw dot on active box
         if active_box is not None:
@@ -478,57 +551,82 @@ class ToolWheel():
                     dx = box.x + box.w + 2 * ui_scale
                     dy = box.y - 24 * ui_scale
 
-            draw_texture_2d(td.textures['active_dot'], (dx, dy), 10 * ui_scale, 10 * ui_scale)
+            self.draw_tinted_mask(td.textures['active_dot'], self.dot_color, dx, dy, 10 * ui_scale, 10 * ui_scale)
 
         # Draw active mode or tool name as hint
         # Note: this must be done last, because blf messes with the alpha state
-        if bpy.app.version >= (3, 4, 0):
-            blf.size(0, 11 * ui_scale)
-        else:
-            blf.size(0, 11 * ui_scale, 72)
+        set_font_size(FONT_SIZE * ui_scale)
 
         if self.show_hints and active_box is not None:
             # Draw rectangle in center of wheel
-            hint_w = round(self.HINT_WIDTH * ui_scale)
-            hint_h = round(self.HINT_HEIGHT * ui_scale)
-            dx = self.center_x - hint_w * 0.5
-            dy = self.center_y - hint_h * 0.5
-            draw_texture_2d(self.hint_texture, (dx, dy), hint_w, hint_h)
+            dy = -round(self.HINT_HEIGHT * ui_scale) * 0.5
+            self.shader_box.bind()
+            self.shader_box.uniform_float('active_box', -1)
+            self.shader_box.uniform_float('highlight_rect', (0, 0, -1, -1))
+            self.batch_hint.draw(self.shader_box)
+            self.draw_calls += 1
 
             # Draw hint text
-            if self.active_tool == -1:
-                hint = td.tools_per_mode[self.active_mode]['name']
+            if self.active_button is None:
+                hint = active_box.title
             else:
-                tool = td.tools_per_mode[self.active_mode]['tools'][self.active_tool]
-                if use_brush_assets and 'as_asset' in tool and 'name' in tool['as_asset']:
-                    hint = tool['as_asset']['name']
-                else:
-                    hint = tool['name']
-            tw, _ = blf.dimensions(0, hint)
-            tx = self.center_x - tw * 0.5
+                hint = self.active_button.record.name
+                if self.active_button.is_stale:
+                    hint += ' (missing)'
+            tw = get_text_width(hint, FONT_SIZE, ui_scale)
+            tx = -tw * 0.5
             blf.color(0, self.text_color[0], self.text_color[1], self.text_color[2], 0.8)
             blf.position(0, tx, dy + 6 * ui_scale, 0)
             blf.draw(0, hint)
 
-        # Draw centered box title and hotkey on the right
+        # Draw box title and hotkey
         for box in self.boxes:
-            # Title
-            text = td.tools_per_mode[box.mode]['name']
-            tw, _ = blf.dimensions(0, text)
-            dx = int((box.w - tw) * 0.5) - ModeBox.BOX_PADDING * ui_scale
-            alpha = 0.9 if box.mode == self.active_mode else 0.25
+            is_active = box is active_box
+            alpha = 0.9 if is_active else 0.25
             blf.color(0, self.text_color[0], self.text_color[1], self.text_color[2], alpha)
-            blf.position(0, box.title_x + dx, box.title_y, 0)
-            blf.draw(0, text)
-
-            # Hotkey
-            text = box.hotkey
-            tw, _ = blf.dimensions(0, text)
-            dx = box.x + box.w - ModeBox.BOX_PADDING * 2 * ui_scale - tw
-            alpha = 0.4 if box.mode == self.active_mode else 0.15
+            blf.position(0, box.title_x, box.title_y, 0)
+            blf.draw(0, box.title)
+
+            alpha = 0.4 if is_active else 0.15
             blf.color(0, self.text_color[0], self.text_color[1], self.text_color[2], alpha)
-            blf.position(0, dx, box.title_y, 0)
-            blf.draw(0, text)
+            blf.position(0, box.hotkey_x, box.title_y, 0)
+            blf.draw(0, box.hotkey)
+
+        # Record latency (the performance HUD not included)
+        end_time = perf_counter()
+        self.last_draw_time = end_time - start_time
+        latency_metrics.add('draw', self.last_draw_time)
+        if self.invoke_time is not None:
+            latency_metrics.add('invoke_to_draw', end_time - self.invoke_time)
+            self.invoke_time = None
+
+        # Draw performance HUD
+        if self.show_perf_hud:
+            self.draw_perf_hud(ui_scale)
 
         # Reset gpu state
+        gpu.matrix.pop()
         gpu.state.blend_set('NONE')
+
+    # Draw timings and counts of the wheel below its bottom left corner, to tell the time spent
+    # in the wheel apart from the time of the viewport redraw it triggers
+    def draw_perf_hud(self, ui_scale):
+        # Redraw rate and interval over the last frames
+        rate = 0
+        interval = 0
+        if len(self.frame_times) > 1:
+            interval = (self.frame_times[-1] - self.frame_times[0]) / (len(self.frame_times) - 1)
+            rate = 1 / interval if interval > 0 else 0
+
+        lines = [
+            f'Draw {self.last_draw_time * 1000:.2f} ms, {self.draw_calls} draw calls, '
+            f'{self.texture_binds} texture binds',
+            f'Redraws {rate:.0f}/s, frame interval {interval * 1000:.1f} ms',
+            f'Prepare {self.prepare_time * 1000:.2f} ms',
+        ]
+
+        blf.color(0, self.text_color[0], self.text_color[1], self.text_color[2], 0.8)
+        line_h = (FONT_SIZE + 4) * ui_scale
+        for i, line in enumerate(lines):
+            blf.position(0, self.hit_grid.x, self.hit_grid.y - (i + 1) * line_h, 0)
+            blf.draw(0, line)
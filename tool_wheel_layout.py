@@ -0,0 +1,215 @@
+'''
+GP Tool Wheel
+
+Tool wheel layout
+Geometry of the mode boxes and tool buttons, relative to the wheel center.
+Plain data without Blender dependencies, cached per combination of box positions, tool counts and ui scale.
+'''
+
+import math
+from collections import namedtuple
+from functools import lru_cache
+
+
+# Constants
+BUTTON_IMG_SIZE = 32
+BUTTON_IMG_PADDING = 2
+BUTTON_SIZE = BUTTON_IMG_SIZE + 2 * BUTTON_IMG_PADDING + 1
+BOX_PADDING = 4
+BUTTONS_PER_ROW = 4
+TITLE_HEIGHT = 18
+BOX_SPACING = -65
+BOX_ANGLE = math.radians(3.5)
+HIT_MAP_STRIDE = 256
+# Size of the cells of the hit grid, in pixels at ui scale 1
+HIT_CELL_SIZE = 16
+
+# Tool button: top left corner (x, y), size of the icon and separator lines on the right and top
+ButtonLayout = namedtuple('ButtonLayout', ['x', 'y', 'w', 'h', 'separator_right', 'separator_top'])
+
+# Mode box: box index (position in the wheel), top left corner (x, y), size, buttons
+# and the quads of the separator lines between the buttons
+BoxLayout = namedtuple('BoxLayout', ['index', 'x', 'y', 'w', 'h', 'row_count', 'upwards', 'sep_offset',
+                                     'buttons', 'separator_coords'])
+
+# Hit grid: coarse grid of cells over the wheel bounding box, starting at (x, y), with per cell the
+# rectangles (x0, y0, x1, y1, hit) overlapping it, in order of precedence
+HitGrid = namedtuple('HitGrid', ['cells', 'x', 'y', 'cell_size', 'columns', 'rows'])
+
+# Wheel: boxes, bounding box (min_x, min_y, max_x, max_y) and the hit grid for finding the box and button
+# under the mouse cursor
+WheelLayout = namedtuple('WheelLayout', ['boxes', 'bounds', 'hit_grid'])
+
+
+# Get layout of the tool wheel, relative to the wheel center.
+# box_specs is a tuple of (box index, tool count) per active mode.
+@lru_cache(maxsize=16)
+def get_wheel_layout(box_specs, ui_scale):
+    if len(box_specs) == 0:
+        return None
+
+    # Box size
+    box_w = round((2 * BOX_PADDING + BUTTONS_PER_ROW * BUTTON_SIZE) * ui_scale)
+    box_w_half = int(box_w * 0.5)
+    wheel_radius = box_w + BOX_SPACING * ui_scale
+    dx = math.cos(BOX_ANGLE) * wheel_radius
+    dy = math.sin(BOX_ANGLE) * wheel_radius
+    wheel_radius = int(wheel_radius * 0.5)
+
+    boxes = []
+    for box_index, tool_count in box_specs:
+        row_count = math.ceil(tool_count / BUTTONS_PER_ROW)
+        box_h = round((2 * BOX_PADDING + row_count * BUTTON_SIZE + TITLE_HEIGHT) * ui_scale)
+
+        # Position box in wheel
+        match box_index:
+            case 0:
+                x = -dx - box_w
+                y = dy + box_h
+            case 1:
+                x = -box_w_half
+                y = wheel_radius + box_h
+            case 2:
+                x = dx
+                y = dy + box_h
+            case 3:
+                x = dx
+                y = -dy
+            case 4:
+                x = -box_w_half
+                y = -wheel_radius
+            case 5:
+                x = -dx - box_w
+                y = -dy
+
+        upwards = box_index in {0, 1, 2}
+        sep_offset = 1 if box_index in {2, 3} else 0
+        buttons = get_button_layouts(box_index, x, y, box_h, tool_count, row_count, upwards, ui_scale)
+        separator_coords = get_separator_coords(x, box_w, buttons, sep_offset, ui_scale)
+        boxes.append(BoxLayout(box_index, x, y, box_w, box_h, row_count, upwards, sep_offset,
+                               buttons, separator_coords))
+
+    # Get bounding box
+    bounds = (min(box.x for box in boxes),
+              min(box.y - box.h for box in boxes),
+              max(box.x + box.w for box in boxes),
+              max(box.y for box in boxes))
+
+    return WheelLayout(tuple(boxes), bounds, get_hit_grid(boxes, bounds, ui_scale))
+
+
+# Get tool buttons within a box, in rows of four, right to left in the boxes on the left side of the wheel
+def get_button_layouts(box_index, box_x, box_y, box_h, tool_count, row_count, upwards, ui_scale):
+    padding = BOX_PADDING * ui_scale
+    bsize = BUTTON_SIZE * ui_scale
+    button_w = round(BUTTON_IMG_SIZE * ui_scale)
+    right_to_left = box_index in {0, 5}
+    row = 0
+    column = BUTTONS_PER_ROW - 1 if right_to_left else 0
+    dir = -1 if right_to_left else 1
+
+    buttons = []
+    for _ in range(tool_count):
+        # Calculate position
+        x = box_x + padding + bsize * column
+        if upwards:
+            y = box_y - box_h + padding + bsize * (row + 1)
+        else:
+            y = box_y - padding - bsize * row
+
+        # Line separator on the right and top?
+        separator_right = column != BUTTONS_PER_ROW - 1
+        separator_top = column == 0 and ((upwards and row < row_count - 1) or (not upwards and row > 0))
+
+        buttons.append(ButtonLayout(x, y, button_w, button_w, separator_right, separator_top))
+
+        # Increase column (and row)
+        column += dir
+        if column >= BUTTONS_PER_ROW or column < 0:
+            column = BUTTONS_PER_ROW - 1 if right_to_left else 0
+            row += 1
+
+    return tuple(buttons)
+
+
+# Get quads of the separator lines between the buttons of a box
+def get_separator_coords(box_x, box_w, buttons, sep_offset, ui_scale):
+    coords = []
+    for button in buttons:
+        if button.separator_right:
+            x0 = round(button.x + button.w + BOX_PADDING * ui_scale + sep_offset)
+            y0 = round(button.y - BOX_PADDING * ui_scale)
+            y1 = round(button.y - button.h)
+            coords.extend(((x0, y0), (x0 - 1, y0), (x0, y1), (x0 - 1, y1)))
+        if button.separator_top:
+            x0 = round(box_x + BOX_PADDING * ui_scale + sep_offset)
+            x1 = round(box_x + box_w - BOX_PADDING * ui_scale + sep_offset)
+            y0 = round(button.y + sep_offset)
+            coords.extend(((x0, y0), (x0, y0 + 1), (x1, y0), (x1, y0 + 1)))
+    return tuple(coords)
+
+
+# Create coarse grid over the wheel bounding box, with per cell the box and button rectangles overlapping it.
+# Hit value is box_i * HIT_MAP_STRIDE (box) or box_i * HIT_MAP_STRIDE + button_i + 1 (button).
+def get_hit_grid(boxes, bounds, ui_scale):
+    min_x = math.floor(bounds[0])
+    min_y = math.floor(bounds[1])
+    cell_size = HIT_CELL_SIZE * ui_scale
+    columns = int((math.ceil(bounds[2]) - min_x) // cell_size) + 1
+    rows = int((math.ceil(bounds[3]) - min_y) // cell_size) + 1
+
+    # Rectangles in order of precedence: buttons before the box they are in, and of buttons
+    # sharing an edge the next one
+    bsize = BUTTON_SIZE * ui_scale
+    rects = []
+    for box_i, box in reversed(tuple(enumerate(boxes))):
+        for button_i, button in reversed(tuple(enumerate(box.buttons))):
+            rects.append((button.x, button.y - bsize, button.x + bsize, button.y, box_i * HIT_MAP_STRIDE + button_i + 1))
+        rects.append((box.x, box.y - box.h, box.x + box.w, box.y, box_i * HIT_MAP_STRIDE))
+
+    # Add rectangles to the cells they overlap
+    cells = [[] for _ in range(columns * rows)]
+    for rect in rects:
+        x0, y0, x1, y1, _ = rect
+        for row in range(int((y0 - min_y) // cell_size), int((y1 - min_y) // cell_size) + 1):
+            for column in range(int((x0 - min_x) // cell_size), int((x1 - min_x) // cell_size) + 1):
+                cells[row * columns + column].append(rect)
+
+    return HitGrid(tuple(tuple(cell) for cell in cells), min_x, min_y, cell_size, columns, rows)
+
+
+# Get the box and button at a pixel (relative to the wheel center): hit value of the hit grid or -1 (nothing).
+# The pixel span of a rectangle is inclusive at both ends.
+def get_hit(hit_grid, x, y):
+    column = int((x - hit_grid.x) // hit_grid.cell_size)
+    row = int((y - hit_grid.y) // hit_grid.cell_size)
+    if not (0 <= column < hit_grid.columns and 0 <= row < hit_grid.rows):
+        return -1
+    for x0, y0, x1, y1, hit in hit_grid.cells[row * hit_grid.columns + column]:
+        if x0 <= x <= x1 and y0 <= y <= y1:
+            return hit
+    return -1
+
+
+# Get whole pixel offset of the wheel center that keeps the wheel within the area bounds.
+# Paddings are (left, right, bottom, top): the space taken by toolbar, sidebar, asset shelf and headers.
+def get_clamp_offset(bounds, center_x, center_y, area_width, area_height, paddings):
+    left_padding, right_padding, bottom_padding, top_padding = paddings
+    min_x = center_x + bounds[0]
+    min_y = center_y + bounds[1]
+    max_x = center_x + bounds[2]
+    max_y = center_y + bounds[3]
+
+    dx = 0
+    dy = 0
+    if min_x < left_padding:
+        dx = math.ceil(left_padding - min_x)
+        max_x += dx
+    if max_x > area_width - right_padding:
+        dx = math.floor(area_width - right_padding - max_x)
+    if min_y < bottom_padding:
+        dy = math.ceil(bottom_padding - min_y)
+        max_y += dy
+    if max_y > area_height - top_padding:
+        dy = math.floor(area_height - top_padding - max_y)
+    return dx, dy
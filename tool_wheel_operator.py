@@ -1,7 +1,12 @@
+from time import perf_counter
+
 import bpy
+from bpy.app.handlers import persistent
 from bpy.types import Operator
 
 from . import tool_wheel_draw
+from .brush_assets import brush_asset_cache, schedule_brush_asset_index
+from .performance import latency_metrics
 from .tool_data import tool_data as td
 
 
@@ -10,8 +15,11 @@ class GPENCIL_OT_tool_wheel(Operator):
     bl_idname = "gpencil.tool_wheel"
     bl_label = "Grease Pencil Tool Wheel"
     bl_options = {'REGISTER', 'UNDO'}
+    # Push undo steps explicitly, for operator variants without the 'UNDO' option
+    push_undo_steps = False
 
     _draw_handle = None
+    _hover_state = None
     _show_brush = [True, True, True, True]
     _unprojected_radius = [0.0, 0.0, 0.0, 0.0, 0.0]
     tool_wheel = tool_wheel_draw.ToolWheel()
@@ -34,60 +42,34 @@ class GPENCIL_OT_tool_wheel(Operator):
         # Get Grease Pencil version
         is_gp_legacy = context.object.type == 'GPENCIL'
 
-        # From 4.3 on, use brush assets
-        use_brush_assets = (bpy.app.version >= (4, 3, 0))
-
         # Get selected mode
-        mode = td.tools_per_mode[new_mode]
+        mode = td.mode_records[new_mode]
+        tool = mode.tools[new_tool] if new_tool != -1 else None
+        is_draw_tool = new_mode == 'draw' and new_tool == td.draw_tool_index
 
         # Remember last used draw brush asset
-        if use_brush_assets and not (new_mode == 'draw' and new_tool == td.draw_tool_index):
+        if td.use_brush_assets and not is_draw_tool:
             store_active_draw_brush()
 
         # Switch to mode
-        if is_gp_legacy and mode['mode'] != context.mode:
-            match(new_mode):
-                case 'object':
-                    bpy.ops.object.mode_set(mode='OBJECT')
-                case 'edit':
-                    bpy.ops.gpencil.editmode_toggle()
-                case 'sculpt':
-                    bpy.ops.gpencil.sculptmode_toggle()
-                case 'draw':
-                    bpy.ops.gpencil.paintmode_toggle()
-                case 'weight':
-                    bpy.ops.gpencil.weightmode_toggle()
-                case 'vertex':
-                    bpy.ops.gpencil.vertexmode_toggle()
-        elif not is_gp_legacy and mode['modev3'] != context.mode:
-            match(new_mode):
-                case 'object':
-                    bpy.ops.object.mode_set(mode='OBJECT')
-                case 'edit':
-                    bpy.ops.object.mode_set(mode='EDIT')
-                case 'sculpt':
-                    bpy.ops.object.mode_set(mode='SCULPT_GREASE_PENCIL')
-                case 'draw':
-                    bpy.ops.object.mode_set(mode='PAINT_GREASE_PENCIL')
-                case 'weight':
-                    bpy.ops.object.mode_set(mode='WEIGHT_GREASE_PENCIL')
-                case 'vertex':
-                    bpy.ops.object.mode_set(mode='VERTEX_GREASE_PENCIL')
-        elif new_tool == -1:
+        undo_message = None
+        if is_gp_legacy and mode.context_mode_legacy != context.mode:
+            mode.switch_legacy()
+            undo_message = mode.name
+        elif not is_gp_legacy and mode.context_mode != context.mode:
+            mode.switch()
+            undo_message = mode.name
+        elif tool is None:
             return {'CANCELLED'}
 
         # Get selected tool
-        if new_tool == -1:
+        if tool is None:
+            self.push_undo_step(undo_message)
             return {'FINISHED'}
 
-        tool = mode['tools'][new_tool]['tool']
-        tool_as_asset = None
-        if use_brush_assets and 'as_asset' in mode['tools'][new_tool]:
-            tool_as_asset = mode['tools'][new_tool]['as_asset']
-
         # Handle 'add' tools
-        if tool.startswith('add.'):
-            match tool:
+        if tool.is_add_tool:
+            match tool.tool_id:
                 case 'add.empty':
                     bpy.ops.object.empty_add(radius=0.1)
                 case 'add.bone':
@@ -102,44 +84,50 @@ class GPENCIL_OT_tool_wheel(Operator):
                         bpy.ops.object.gpencil_add(type='EMPTY')
                     else:
                         bpy.ops.object.grease_pencil_add(type='EMPTY')
+            self.push_undo_step(tool.name)
             return {'FINISHED'}
 
         # Switch to tool
-        if tool_as_asset is None:
-            bpy.ops.wm.tool_set_by_id(name=tool)
+        # From 4.3 on, use brush assets for drawing and sculpting and tools for all the others
+        use_asset = tool.use_asset
+
+        # Edge case: when switching from a Tint brush to the Draw tool,
+        # use the previously stored draw brush asset.
+        if td.use_brush_assets and is_draw_tool:
+            use_asset = (get_draw_brush_type(context.tool_settings.gpencil_paint) == 'TINT')
+
+        # Switch to the new tool or brush asset
+        if use_asset:
+            # Set brush asset
+            paint = getattr(context.tool_settings, mode.paint_settings) if mode.paint_settings else None
+            status = brush_asset_cache.activate(context, paint, tool.asset)
+            if status == 'ADDED':
+                # Brush datablock added to the session: data to undo
+                undo_message = tool.name
+            elif status == 'FAILED':
+                # Asset not found: report it, a mode switch made before stays
+                self.report({'WARNING'}, f"Brush asset '{tool.asset['relative_asset_identifier']}' not found, "
+                                         "please check the GP Tool Wheel preferences")
+                self.push_undo_step(undo_message)
+                return {'CANCELLED'} if undo_message is None else {'FINISHED'}
         else:
-            # From 4.3 on, use brush assets for drawing and sculpting and tools for all the others
-            use_asset = False if tool_as_asset['tool'] else True
-
-            # Edge case: when switching from a Tint brush to the Draw tool,
-            # use the previously stored draw brush asset.
-            if new_mode == 'draw' and new_tool == td.draw_tool_index:
-                use_asset = (get_draw_brush_type(context.tool_settings.gpencil_paint) == 'TINT')
-
-            # Switch to the new tool or brush asset
-            if use_asset:
-                # Set brush asset
-                bpy.ops.brush.asset_activate(asset_library_type=tool_as_asset['asset_library_type'],
-                                             asset_library_identifier=tool_as_asset['asset_library_identifier'],
-                                             relative_asset_identifier=tool_as_asset['relative_asset_identifier'])
-            else:
-                # Set tool
-                bpy.ops.wm.tool_set_by_id(name=tool_as_asset['tool'])
-
-                # Check for unintended active Tint tool (can happen when switching from primitives to draw tool)
-                if use_brush_assets and new_mode == 'draw' and new_tool == td.draw_tool_index:
-                    bpy.app.timers.register(self.check_unintended_tint_tool, first_interval=0.1)
+            # Set tool
+            bpy.ops.wm.tool_set_by_id(name=tool.tool_id)
+
+            # Check for unintended active Tint tool (can happen when switching from primitives to draw tool),
+            # right away and on the first brush change that follows
+            if td.use_brush_assets and is_draw_tool:
+                if not correct_unintended_tint_tool():
+                    watch_unintended_tint_tool()
 
+        self.push_undo_step(undo_message)
         return {'FINISHED'}
 
-    def check_unintended_tint_tool(self):
-        gp_paint = bpy.context.tool_settings.gpencil_paint
-        if gp_paint.brush is not None and (get_draw_brush_type(gp_paint) == 'TINT'):
-            # Switch to previously stored draw brush asset
-            tool_as_asset = td.tools_per_mode['draw']['tools'][td.draw_tool_index]['as_asset']
-            bpy.ops.brush.asset_activate(asset_library_type=tool_as_asset['asset_library_type'],
-                                         asset_library_identifier=tool_as_asset['asset_library_identifier'],
-                                         relative_asset_identifier=tool_as_asset['relative_asset_identifier'])
+    # Push one undo step for a mode switch, added object or added brush (no message: nothing to undo).
+    # Operators called from another operator don't push undo steps of their own, so this is the only step.
+    def push_undo_step(self, message):
+        if self.push_undo_steps and message is not None:
+            bpy.ops.ed.undo_push(message=message)
 
     # Check modal events
     def modal(self, context, event):
@@ -154,18 +142,27 @@ class GPENCIL_OT_tool_wheel(Operator):
 
         # Handle left mouse click
         if event.type == 'LEFTMOUSE':
-            return self.switch_mode_and_tool(context, self.tool_wheel.active_mode, self.tool_wheel.active_tool)
-
-        # Redraw area on mouse move
+            start_time = perf_counter()
+            self.tool_wheel.update_hover(event.mouse_region_x, event.mouse_region_y)
+            result = self.switch_mode_and_tool(context, self.tool_wheel.active_mode, self.tool_wheel.active_tool)
+            latency_metrics.add('click_to_switch', perf_counter() - start_time)
+            return result
+
+        # Resolve hovered mode and tool on mouse move,
+        # redraw area only when that changes the look of the wheel
         if event.type == 'MOUSEMOVE':
-            self.tool_wheel.mouse_x = event.mouse_region_x
-            self.tool_wheel.mouse_y = event.mouse_region_y
-            context.area.tag_redraw()
+            self.tool_wheel.update_hover(event.mouse_region_x, event.mouse_region_y)
+            hover_state = self.tool_wheel.get_hover_state()
+            if hover_state != self._hover_state:
+                self._hover_state = hover_state
+                context.area.tag_redraw()
 
         return {'RUNNING_MODAL'}
 
     # Invoke operator
     def invoke(self, context, event):
+        invoke_time = perf_counter()
+
         # Mouse cursor outside viewport?
         area = context.area
         if (event.mouse_x < area.x or
@@ -174,9 +171,18 @@ class GPENCIL_OT_tool_wheel(Operator):
                 area.y + area.height - event.mouse_y < 54):
             return {'CANCELLED'}
 
+        # Stop watching brush changes of a previous tool switch
+        unwatch_unintended_tint_tool()
+
+        # Remember the draw brush, in case the tool changed after the last brush change
+        if td.use_brush_assets:
+            store_active_draw_brush()
+
         # Prepare draw
         if not self.tool_wheel.prepare(event, area, context):
             return {'CANCELLED'}
+        self._hover_state = self.tool_wheel.get_hover_state()
+        self.tool_wheel.invoke_time = invoke_time
 
         # Set cursor to default
         context.window.cursor_modal_set('DEFAULT')
@@ -215,6 +221,16 @@ class GPENCIL_OT_tool_wheel(Operator):
         self.tool_wheel.end()
 
 
+# Tool wheel variant without undo step for switching tools within a mode,
+# only mode switches, added objects and added brushes get an undo step
+class GPENCIL_OT_tool_wheel_no_undo(GPENCIL_OT_tool_wheel):
+    '''Grease Pencil tool wheel for quickly selecting tools in another mode, without undo step for tool switches'''
+    bl_idname = "gpencil.tool_wheel_no_undo"
+    bl_label = "Grease Pencil Tool Wheel (Undo-Free)"
+    bl_options = {'REGISTER'}
+    push_undo_steps = True
+
+
 def get_draw_brush_type(gp_paint):
     if hasattr(gp_paint.brush, 'gpencil_tool'):
         return gp_paint.brush.gpencil_tool
@@ -224,17 +240,150 @@ def get_draw_brush_type(gp_paint):
 def store_active_draw_brush():
     context = bpy.context
     if context.mode != 'PAINT_GREASE_PENCIL' or context.tool_settings is None or context.tool_settings.gpencil_paint is None:
-        return 2.0
+        return
     gp_paint = context.tool_settings.gpencil_paint
     if gp_paint.brush is None:
-        return 2.0
+        return
     if get_draw_brush_type(gp_paint) == 'DRAW':
         tool = context.workspace.tools.from_space_view3d_mode(context.mode, create=False)
         brush_asset = gp_paint.brush_asset_reference
-        if tool.idname == 'builtin.brush' and brush_asset is not None:
+        if tool is not None and tool.idname == 'builtin.brush' and brush_asset is not None:
             # Store the draw brush asset
-            td.tools_per_mode['draw']['tools'][td.draw_tool_index]['as_asset']['asset_library_type'] = brush_asset.asset_library_type
-            td.tools_per_mode['draw']['tools'][td.draw_tool_index]['as_asset']['asset_library_identifier'] = brush_asset.asset_library_identifier
-            td.tools_per_mode['draw']['tools'][td.draw_tool_index]['as_asset']['relative_asset_identifier'] = brush_asset.relative_asset_identifier
+            asset = td.mode_records['draw'].tools[td.draw_tool_index].asset
+            asset['asset_library_type'] = brush_asset.asset_library_type
+            asset['asset_library_identifier'] = brush_asset.asset_library_identifier
+            asset['relative_asset_identifier'] = brush_asset.relative_asset_identifier
+
+
+# When the Tint brush is active in Draw mode, switch to the previously stored draw brush asset
+def correct_unintended_tint_tool():
+    gp_paint = bpy.context.tool_settings.gpencil_paint
+    if gp_paint is None or gp_paint.brush is None or get_draw_brush_type(gp_paint) != 'TINT':
+        return False
+
+    brush_asset_cache.activate(bpy.context, gp_paint, td.mode_records['draw'].tools[td.draw_tool_index].asset)
+    return True
+
+
+# Owner of the one-shot message bus subscription, checking the brush after switching to the Draw tool
+tint_check_msgbus_owner = object()
+
+
+def on_brush_change_after_switch(*_):
+    if end_tint_check():
+        correct_unintended_tint_tool()
+
+
+def on_mode_change_after_switch(*_):
+    end_tint_check()
+
+
+# End the check on its first notification, returns False when it has ended already.
+# A subscription can't be cleared from within its own notification (the message bus still uses it
+# afterwards), so it is cleared in a timer right after.
+def end_tint_check():
+    if bpy.app.timers.is_registered(clear_tint_check_subscription):
+        return False
+    bpy.app.timers.register(clear_tint_check_subscription, first_interval=0)
+    return True
+
+
+def clear_tint_check_subscription():
+    bpy.msgbus.clear_by_owner(tint_check_msgbus_owner)
+    return None
+
+
+# Check for an unintended Tint brush on the first brush change after a tool switch.
+# The check ends on that brush change, a mode change or the next wheel invocation, so that a Tint brush
+# picked by the user later on is left alone. This relies on the message bus publishing the brush change
+# the toolsystem makes when activating the Draw tool; without it, the check made right after the
+# switch is all there is.
+def watch_unintended_tint_tool():
+    unwatch_unintended_tint_tool()
+    for key in [(bpy.types.GpPaint, 'brush'), (bpy.types.GpPaint, 'brush_asset_reference')]:
+        bpy.msgbus.subscribe_rna(key=key, owner=tint_check_msgbus_owner, args=(), notify=on_brush_change_after_switch)
+    bpy.msgbus.subscribe_rna(key=(bpy.types.Object, 'mode'), owner=tint_check_msgbus_owner, args=(),
+                             notify=on_mode_change_after_switch)
+
+
+def unwatch_unintended_tint_tool():
+    bpy.msgbus.clear_by_owner(tint_check_msgbus_owner)
+    if bpy.app.timers.is_registered(clear_tint_check_subscription):
+        bpy.app.timers.unregister(clear_tint_check_subscription)
+
+
+# Owner of the message bus subscriptions for tracking the active draw brush
+draw_brush_msgbus_owner = object()
+
+
+# Remember the draw brush when the active brush or tool changes
+def on_draw_brush_change(*_):
+    store_active_draw_brush()
+
+
+# Subscribe to changes of the active Grease Pencil paint brush.
+# Tool changes (without a brush change) aren't published on the message bus,
+# those are covered by storing the draw brush when the wheel is invoked.
+def subscribe_to_draw_brush():
+    bpy.msgbus.clear_by_owner(draw_brush_msgbus_owner)
+    keys = [(bpy.types.GpPaint, 'brush'), (bpy.types.GpPaint, 'brush_asset_reference')]
+    for key in keys:
+        bpy.msgbus.subscribe_rna(key=key, owner=draw_brush_msgbus_owner, args=(),
+                                 notify=on_draw_brush_change, options={'PERSISTENT'})
+
+
+def unsubscribe_from_draw_brush():
+    bpy.msgbus.clear_by_owner(draw_brush_msgbus_owner)
+
+
+# Build the wheel ahead of the next invocation, so that invoke only has to place it at the cursor
+def warm_up_tool_wheel():
+    # Icons not loaded yet? (the addon init schedules a warm-up when they are)
+    if td.icon_atlas is None:
+        return None
+
+    GPENCIL_OT_tool_wheel.tool_wheel.update_model(bpy.context)
+    return None
+
+
+# Schedule a warm-up when Blender is idle, postponed while changes follow each other quickly
+# (like dragging over multiple tool checkboxes in the preferences)
+def schedule_warm_up():
+    cancel_warm_up()
+    bpy.app.timers.register(warm_up_tool_wheel, first_interval=0.3)
+
+
+def cancel_warm_up():
+    if bpy.app.timers.is_registered(warm_up_tool_wheel):
+        bpy.app.timers.unregister(warm_up_tool_wheel)
+
+
+# Owner of the message bus subscriptions for theme and ui scale changes
+wheel_style_msgbus_owner = object()
+
+
+def on_wheel_style_change(*_):
+    schedule_warm_up()
+
+
+# Subscribe to changes of the theme and ui scale, which the wheel colors and size depend on
+def subscribe_to_wheel_style():
+    bpy.msgbus.clear_by_owner(wheel_style_msgbus_owner)
+    keys = [(bpy.types.PreferencesView, 'ui_scale'), bpy.types.ThemeWidgetColors]
+    for key in keys:
+        bpy.msgbus.subscribe_rna(key=key, owner=wheel_style_msgbus_owner, args=(),
+                                 notify=on_wheel_style_change, options={'PERSISTENT'})
+
+
+def unsubscribe_from_wheel_style():
+    bpy.msgbus.clear_by_owner(wheel_style_msgbus_owner)
+
 
-    return 2.0
+# Message bus subscriptions are cleared when a file is loaded, so subscribe again
+@persistent
+def on_load_post(*_):
+    if bpy.app.version >= (4, 3, 0):
+        subscribe_to_draw_brush()
+        brush_asset_cache.clear()
+        schedule_brush_asset_index()
+    subscribe_to_wheel_style()